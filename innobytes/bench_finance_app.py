@@ -0,0 +1,319 @@
+import argparse
+import concurrent.futures
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from finance_app import FinanceApp, PasswordHasher
+
+CATEGORIES = ['Food', 'Rent', 'Transport', 'Utilities', 'Entertainment', 'Health', 'Shopping', 'Salary']
+BENCHMARKS = ['ingest', 'password', 'login', 'report', 'budget', 'store', 'backup']
+HASH_COSTS = ['scrypt:8192', 'scrypt:16384', 'scrypt:32768', 'pbkdf2_sha256:100000', 'pbkdf2_sha256:600000']
+
+def synthetic_transactions(count, seed=0, start=datetime.date(2020, 1, 1), days=365 * 4):
+    # Deterministic for a given seed: same rows, same order, on every machine
+    rng = random.Random(seed)
+    for _ in range(count):
+        category = rng.choice(CATEGORIES)
+        transaction_type = 'income' if category == 'Salary' else 'expense'
+        yield (round(rng.uniform(1, 500), 2), category, start + datetime.timedelta(days=rng.randrange(days)),
+               transaction_type)
+
+def generate_dataset(app, users, transactions, years, seed=0, start=datetime.date(2020, 1, 1)):
+    # Spreads `transactions` rows evenly over `users` users and `years` years,
+    # with a budget on every expense category. Each user gets a derived seed.
+    per_user = transactions // users
+    usernames = [f"user{number:04d}" for number in range(users)]
+    for number, username in enumerate(usernames):
+        app.register_user(username, 'bench')
+        app.login(username, 'bench')
+        for category in CATEGORIES[:-1]:
+            app.set_budget(category, 1000)
+        app.add_transactions(synthetic_transactions(per_user, seed * 100003 + number, start, 365 * years),
+                             batch_size=5000)
+    return usernames
+
+@contextlib.contextmanager
+def quiet():
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+@contextlib.contextmanager
+def measure(result, trace_memory=False):
+    # Records elapsed seconds into `result`, plus the process RSS high-water mark
+    # before and after. The mark only moves when a step grows the process past
+    # every earlier step, so a per-step peak needs --trace-memory: tracemalloc
+    # records the Python heap peak of just this step but slows it down.
+    if trace_memory:
+        tracemalloc.start()
+    high_water_before = peak_rss_bytes()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        result['seconds'] = time.perf_counter() - start
+        if trace_memory:
+            result['peak_python_bytes'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        result['process_peak_rss_before_bytes'] = high_water_before
+        result['process_peak_rss_after_bytes'] = peak_rss_bytes()
+
+def fresh_database(directory, name):
+    # Datasets must not depend on earlier runs in the same --directory
+    path = os.path.join(directory, name)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return path
+
+def latency_summary(samples):
+    samples = sorted(samples)
+    return {'count': len(samples), 'mean_ms': statistics.fmean(samples) * 1000,
+            'p50_ms': samples[len(samples) // 2] * 1000,
+            'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+            'max_ms': samples[-1] * 1000}
+
+def bench_ingest(directory, args):
+    results = {}
+    with quiet():
+        app = FinanceApp(fresh_database(directory, 'ingest.db'))
+        app.register_user('ingest', 'bench')
+        app.login('ingest', 'bench')
+        rows = list(synthetic_transactions(args.per_row, args.seed))
+        result = {'rows': len(rows)}
+        with measure(result, args.trace_memory):
+            for row in rows:
+                app.add_transaction(*row)
+        result['rows_per_second'] = len(rows) / result['seconds']
+        results['add_transaction'] = result
+
+        rows = list(synthetic_transactions(args.bulk_rows, args.seed + 1))
+        result = {'rows': len(rows), 'batch_size': args.batch_size}
+        with measure(result, args.trace_memory):
+            app.add_transactions(rows, batch_size=args.batch_size)
+        result['rows_per_second'] = len(rows) / result['seconds']
+        results['add_transactions'] = result
+    app.close()
+    return results
+
+def hash_setting(value):
+    # Validates ALGORITHM:COST up front instead of failing midway through a run
+    algorithm, _, cost = value.partition(':')
+    try:
+        PasswordHasher(algorithm, int(cost))
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(f"invalid hash setting {value!r}: {error}") from None
+    return value
+
+def bench_password(directory, args):
+    # Logins per second at each hashing cost: cold logins clear the verification
+    # cache first, cached logins hit it, and the threaded figure is raw key
+    # derivation throughput across --hash-threads workers
+    results = {}
+    for setting in args.hash_costs:
+        algorithm, cost = setting.split(':')
+        hasher = PasswordHasher(algorithm, int(cost))
+        with quiet():
+            app = FinanceApp(fresh_database(directory, 'password.db'), hasher=hasher)
+            app.register_user(setting, 'bench')
+            cold = []
+            cached = []
+            for _ in range(args.samples):
+                hasher.clear_cache()
+                start = time.perf_counter()
+                app.login(setting, 'bench')
+                cold.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                app.login(setting, 'bench')
+                cached.append(time.perf_counter() - start)
+            password_hash = app.current_user.password
+            app.close()
+        with concurrent.futures.ThreadPoolExecutor(args.hash_threads) as pool:
+            start = time.perf_counter()
+            list(pool.map(PasswordHasher.check, ['bench'] * args.samples, [password_hash] * args.samples))
+            threaded = time.perf_counter() - start
+        results[setting] = {'cold': latency_summary(cold), 'cold_logins_per_second': len(cold) / sum(cold),
+                            'cached': latency_summary(cached), 'cached_logins_per_second': len(cached) / sum(cached),
+                            'threads': args.hash_threads, 'threaded_verifications_per_second': args.samples / threaded}
+    return results
+
+def bench_login(app, users, args):
+    samples = []
+    with quiet():
+        for username in (users * args.samples)[:args.samples]:
+            start = time.perf_counter()
+            app.login(username, 'bench')
+            samples.append(time.perf_counter() - start)
+    return latency_summary(samples)
+
+def bench_report(app, users, args):
+    # Cold runs clear the report cache first; cached runs repeat the same range
+    rng = random.Random(args.seed)
+    spans = {'week': 7, 'month': 31, 'year': 365, 'all': 365 * args.years}
+    results = {}
+    with quiet():
+        app.login(users[0], 'bench')
+        for label, days in spans.items():
+            cold = []
+            cached = []
+            for _ in range(args.samples):
+                offset = rng.randrange(max(1, 365 * args.years - days + 1))
+                start_date = datetime.date(2020, 1, 1) + datetime.timedelta(days=offset)
+                end_date = start_date + datetime.timedelta(days=days - 1)
+                app.report_cache.clear()
+                start = time.perf_counter()
+                app.generate_report(start_date, end_date)
+                cold.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                app.generate_report(start_date, end_date)
+                cached.append(time.perf_counter() - start)
+            results[label] = {'cold': latency_summary(cold), 'cached': latency_summary(cached)}
+    return results
+
+def bench_budget(app, users, args):
+    with quiet():
+        app.login(users[0], 'bench')
+        calls = args.samples * 1000
+        start = time.perf_counter()
+        for number in range(calls):
+            app._check_budget(CATEGORIES[number % (len(CATEGORIES) - 1)])
+        check = (time.perf_counter() - start) / calls
+        start = time.perf_counter()
+        for _ in range(args.samples):
+            app.get_budget_status()
+        status = (time.perf_counter() - start) / args.samples
+    return {'check_budget_us': check * 1e6, 'get_budget_status_us': status * 1e6}
+
+def bench_store(app, users, args):
+    results = {}
+    with quiet():
+        app.login(users[0], 'bench')
+        result = {}
+        with measure(result, args.trace_memory):
+            store = app.transaction_store()
+        result.update(rows=len(store), store_bytes=store.nbytes)
+        results['load'] = result
+        try:
+            analytics = app.analytics()
+        except ImportError:
+            return results
+        for name in ['monthly_series', 'weekly_series', 'category_trends', 'forecast']:
+            start = time.perf_counter()
+            for _ in range(args.samples):
+                getattr(analytics, name)()
+            results[name + '_ms'] = (time.perf_counter() - start) / args.samples * 1000
+    return results
+
+def bench_backup(app, users, args, directory):
+    # Runs last because snapshot_restore replaces the database. The CSV restore
+    # goes over rows that are all present already, i.e. the safe-rerun path.
+    rows = app.conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+    runs = [('csv_backup', lambda: app.backup_data(os.path.join(directory, 'backup.csv'), all_users=True)),
+            ('csv_gz_backup', lambda: app.backup_data(os.path.join(directory, 'backup.csv.gz'), all_users=True)),
+            ('csv_restore', lambda: app.restore_data(os.path.join(directory, 'backup.csv'), all_users=True)),
+            ('snapshot', lambda: app.snapshot_data(os.path.join(directory, 'snapshot.db'))),
+            ('snapshot_restore', lambda: app.restore_snapshot(os.path.join(directory, 'snapshot.db')))]
+    results = {}
+    with quiet():
+        app.current_user = None
+        for label, run in runs:
+            result = {'rows': rows}
+            with measure(result, args.trace_memory):
+                run()
+            result['rows_per_second'] = rows / result['seconds']
+            results[label] = result
+    return results
+
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def run_suite(args, directory):
+    selected = args.only or BENCHMARKS
+    results = {}
+    if 'ingest' in selected:
+        results['ingest'] = bench_ingest(directory, args)
+    if 'password' in selected:
+        results['password'] = bench_password(directory, args)
+    if not set(selected) - {'ingest', 'password'}:
+        return results
+
+    generated = {}
+    with quiet():
+        app = FinanceApp(fresh_database(directory, 'dataset.db'))
+        with measure(generated, args.trace_memory):
+            users = generate_dataset(app, args.users, args.transactions, args.years, args.seed)
+    generated.update(users=len(users), transactions=args.transactions // args.users * args.users)
+    results['generate'] = generated
+    if 'login' in selected:
+        results['login'] = bench_login(app, users, args)
+    if 'report' in selected:
+        results['report'] = bench_report(app, users, args)
+    if 'budget' in selected:
+        results['budget'] = bench_budget(app, users, args)
+    if 'store' in selected:
+        results['store'] = bench_store(app, users, args)
+    if 'backup' in selected:
+        results['backup'] = bench_backup(app, users, args, directory)
+    app.close()
+    return results
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark FinanceApp hot paths on a synthetic dataset.")
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--transactions', type=int, default=200000, help="total transactions across all users")
+    parser.add_argument('--years', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--per-row', type=int, default=2000, help="rows for the per-row add_transaction path")
+    parser.add_argument('--bulk-rows', type=int, default=100000, help="rows for the add_transactions bulk path")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--samples', type=int, default=20, help="repetitions for latency measurements")
+    parser.add_argument('--hash-costs', nargs='+', type=hash_setting, default=HASH_COSTS, metavar='ALGORITHM:COST',
+                        help="password hash settings to compare (scrypt N or PBKDF2 iterations)")
+    parser.add_argument('--hash-threads', type=int, default=4, help="threads for the parallel verification run")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="also record Python heap peaks with tracemalloc (slows the timed code)")
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, help="run only these benchmarks")
+    parser.add_argument('--output', help="write JSON results to this file instead of stdout")
+    parser.add_argument('--directory', help="where to build the databases (default: a temporary directory)")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    started = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    if args.directory:
+        os.makedirs(args.directory, exist_ok=True)
+        results = run_suite(args, args.directory)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            results = run_suite(args, directory)
+    document = {
+        'meta': {'started': started, 'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+                 'platform': platform.platform(), 'process_peak_rss_bytes': peak_rss_bytes(),
+                 'parameters': {name: value for name, value in vars(args).items()
+                                if name not in ('output', 'directory')}},
+        'results': results,
+    }
+    text = json.dumps(document, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import datetime
+
+import numpy as np
+
+from finance_app import TransactionStore
+
+# datetime64[D] counts days from 1970-01-01; TransactionStore keeps proleptic ordinals
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+# 1970-01-05 was the first Monday after the epoch; weeks start on Mondays
+FIRST_MONDAY = 4
+
+class Analytics:
+    # Vectorized time series over a TransactionStore. The store's arrays are
+    # wrapped with np.frombuffer, so building an Analytics object copies nothing.
+    def __init__(self, store):
+        self.store = store
+        self.amounts = np.frombuffer(store.amounts, dtype=np.float64)
+        self.categories = np.frombuffer(store.categories, dtype=np.uint32)
+        self.types = np.frombuffer(store.types, dtype=np.int8)
+        # Day and month numbers are derived once; every series reuses them
+        self.days = np.frombuffer(store.dates, dtype=np.int32).astype(np.int64) - EPOCH_ORDINAL
+        self.months = self.days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+    def _select(self, transaction_type='expense', category=None, start_date=None, end_date=None):
+        # Dates are sorted, so the range is a slice; type and category are masks over it
+        lo, hi = self.store.date_range(start_date, end_date)
+        mask = self.types[lo:hi] == TransactionStore.TYPES.index(transaction_type)
+        if category is not None:
+            code = self.store.find_category(category)
+            if code is None:
+                mask &= False
+            else:
+                mask &= self.categories[lo:hi] == code
+        return slice(lo, hi), mask
+
+    def monthly_series(self, transaction_type='expense', category=None, start_date=None, end_date=None):
+        # Returns (months, totals): consecutive first-of-month dates and the sum for each month
+        rows, mask = self._select(transaction_type, category, start_date, end_date)
+        months, amounts = self.months[rows][mask], self.amounts[rows][mask]
+        if not len(months):
+            return [], np.empty(0)
+        first = months.min()
+        totals = np.bincount(months - first, weights=amounts)
+        labels = np.arange(first, first + len(totals)).astype('datetime64[M]').astype('datetime64[D]')
+        return labels.astype(datetime.date).tolist(), totals
+
+    def weekly_series(self, transaction_type='expense', category=None, start_date=None, end_date=None):
+        # Returns (weeks, totals) keyed by the Monday each week starts on
+        rows, mask = self._select(transaction_type, category, start_date, end_date)
+        days, amounts = self.days[rows][mask], self.amounts[rows][mask]
+        if not len(days):
+            return [], np.empty(0)
+        weeks = (days - FIRST_MONDAY) // 7
+        first = weeks.min()
+        totals = np.bincount(weeks - first, weights=amounts)
+        labels = (np.arange(first, first + len(totals)) * 7 + FIRST_MONDAY).astype('datetime64[D]')
+        return labels.astype(datetime.date).tolist(), totals
+
+    def category_trends(self, transaction_type='expense', start_date=None, end_date=None):
+        # Returns (months, {category: totals}) with every category on the same month axis
+        rows, mask = self._select(transaction_type, None, start_date, end_date)
+        months, amounts, categories = self.months[rows][mask], self.amounts[rows][mask], self.categories[rows][mask]
+        if not len(months):
+            return [], {}
+        first = months.min()
+        width = int(months.max() - first) + 1
+        names = self.store.category_names
+        grid = np.bincount(categories.astype(np.int64) * width + (months - first), weights=amounts,
+                           minlength=len(names) * width).reshape(len(names), width)
+        present = np.flatnonzero(np.bincount(categories, minlength=len(names)))
+        labels = np.arange(first, first + width).astype('datetime64[M]').astype('datetime64[D]')
+        return labels.astype(datetime.date).tolist(), {names[code]: grid[code] for code in present}
+
+    def year_over_year(self, year, transaction_type='expense', category=None):
+        # Monthly totals for `year` against `year - 1`, with the percentage change
+        # per month (nan where the previous year had nothing)
+        current = self._year_totals(year, transaction_type, category)
+        previous = self._year_totals(year - 1, transaction_type, category)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = np.where(previous != 0, (current - previous) / previous * 100, np.nan)
+        return {'year': year, 'current': current, 'previous': previous, 'change_pct': change,
+                'current_total': current.sum(), 'previous_total': previous.sum()}
+
+    def _year_totals(self, year, transaction_type, category):
+        rows, mask = self._select(transaction_type, category, datetime.date(year, 1, 1), datetime.date(year, 12, 31))
+        return np.bincount(self.months[rows][mask] % 12, weights=self.amounts[rows][mask], minlength=12)
+
+    def forecast(self, months_ahead=3, transaction_type='expense', category=None, history=12):
+        # Least-squares linear trend over the last `history` months of totals
+        months, totals = self.monthly_series(transaction_type, category)
+        if not months:
+            return [], np.zeros(months_ahead)
+        totals = totals[-history:]
+        x = np.arange(len(totals))
+        if len(totals) > 1:
+            slope, intercept = np.polyfit(x, totals, 1)
+        else:
+            slope, intercept = 0.0, totals[0]
+        future_x = np.arange(len(totals), len(totals) + months_ahead)
+        last = np.datetime64(months[-1], 'M').astype(np.int64)
+        labels = np.arange(last + 1, last + 1 + months_ahead).astype('datetime64[M]').astype('datetime64[D]')
+        return labels.astype(datetime.date).tolist(), np.maximum(slope * future_x + intercept, 0)
+
+def rolling_average(values, window):
+    # Trailing mean over `window` points; the first window - 1 entries average
+    # over what is available so the output lines up with the input
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return values
+    cumulative = np.cumsum(np.insert(values, 0, 0.0))
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    return (cumulative[1:] - cumulative[np.arange(1, len(values) + 1) - counts]) / counts
@@ -1,26 +1,143 @@
 import hashlib
+import hmac
 import datetime
 import sqlite3
 import os
+import argparse
+import array
+import bisect
+import collections
+import contextlib
 import csv
+import functools
+import gzip
+import io
+import itertools
+import json
+import queue
+import re
+import shlex
+import sys
+import threading
 import colorama
 from colorama import Fore, Back, Style
 import time
 
 colorama.init(autoreset=True)
 
+class PasswordHasher:
+    # Salted key derivation for stored passwords. Hashes describe themselves
+    # ("scrypt$16384$<salt>$<hash>"), so changing the algorithm or cost only
+    # affects new hashes; FinanceApp.login upgrades older ones, including legacy
+    # unsalted SHA-256 hex digests, the next time their owner logs in.
+    ALGORITHMS = ('scrypt', 'pbkdf2_sha256')
+    DEFAULT_COSTS = {'scrypt': 2 ** 14, 'pbkdf2_sha256': 600000}  # scrypt N, PBKDF2 iterations
+    SCRYPT_R = 8
+    SCRYPT_P = 1
+
+    def __init__(self, algorithm='scrypt', cost=None, cache_size=256):
+        if algorithm not in self.ALGORITHMS:
+            raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+        if cost is None:
+            cost = self.DEFAULT_COSTS[algorithm]
+        # Checked here rather than on the first hash(), which login runs only
+        # after a password has already been verified
+        if algorithm == 'scrypt' and not (isinstance(cost, int) and cost > 1 and cost & (cost - 1) == 0):
+            raise ValueError(f"scrypt cost must be a power of two greater than 1, not {cost!r}")
+        if algorithm == 'pbkdf2_sha256' and not (isinstance(cost, int) and cost >= 1):
+            raise ValueError(f"PBKDF2 iterations must be at least 1, not {cost!r}")
+        self.algorithm = algorithm
+        self.cost = cost
+        # Successful verifications, keyed by stored hash, so repeat logins skip the
+        # key derivation. Only a keyed digest of the password is kept, and failed
+        # attempts are never cached, so guessing still pays the full cost.
+        self.cache_size = cache_size
+        self._verified = collections.OrderedDict()
+        self._key = os.urandom(32)
+        self._lock = threading.Lock()
+        self._dummy_hash = None
+
+    def hash(self, password):
+        salt = os.urandom(16)
+        digest = self._derive(self.algorithm, self.cost, password, salt)
+        return f"{self.algorithm}${self.cost}${salt.hex()}${digest.hex()}"
+
+    def verify(self, password, stored):
+        token = hmac.new(self._key, password.encode(), 'sha256').digest()
+        with self._lock:
+            cached = self._verified.get(stored)
+            if cached is not None and hmac.compare_digest(cached, token):
+                self._verified.move_to_end(stored)
+                return True
+        if not self.check(password, stored):
+            return False
+        with self._lock:
+            self._verified[stored] = token
+            while len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+        return True
+
+    def check_missing(self, password):
+        # For usernames that do not exist: pays for the same key derivation as a
+        # real check, so login timing does not reveal which usernames exist
+        if self._dummy_hash is None:
+            self._dummy_hash = self.hash('')
+        self.check(password, self._dummy_hash)
+        return False
+
+    def needs_rehash(self, stored):
+        algorithm, cost, _, _ = self._parse(stored)
+        return (algorithm, cost) != (self.algorithm, self.cost)
+
+    def clear_cache(self):
+        with self._lock:
+            self._verified.clear()
+
+    @classmethod
+    def check(cls, password, stored):
+        # Full verification without the cache; the parameters come from `stored`
+        algorithm, cost, salt, digest = cls._parse(stored)
+        if algorithm == 'sha256':
+            derived = hashlib.sha256(password.encode()).hexdigest()
+        elif algorithm in cls.ALGORITHMS:
+            derived = cls._derive(algorithm, cost, password, salt).hex()
+        else:
+            return False
+        return hmac.compare_digest(derived, digest)
+
+    @classmethod
+    def _derive(cls, algorithm, cost, password, salt):
+        # hashlib releases the GIL here, so worker threads hash in parallel
+        if algorithm == 'scrypt':
+            # maxmem leaves headroom over the 128 * r * N bytes scrypt needs
+            return hashlib.scrypt(password.encode(), salt=salt, n=cost, r=cls.SCRYPT_R, p=cls.SCRYPT_P,
+                                  maxmem=256 * cls.SCRYPT_R * cost)
+        return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, cost)
+
+    @staticmethod
+    def _parse(stored):
+        parts = stored.split('$')
+        if len(parts) == 1:
+            return 'sha256', None, b'', stored
+        if len(parts) != 4:
+            return None, None, b'', ''
+        algorithm, cost, salt, digest = parts
+        try:
+            return algorithm, int(cost), bytes.fromhex(salt), digest
+        except ValueError:
+            return None, None, b'', ''
+
 class User:
-    def __init__(self, username, password):
+    def __init__(self, username, password_hash):
         self.username = username
-        self.password = self._hash_password(password)
+        self.password = password_hash  # as stored in the users table, see PasswordHasher
         self.transactions = []
+        self.store = None  # TransactionStore, loaded on demand
         self.budgets = {}
-
-    def _hash_password(self, password):
-        return hashlib.sha256(password.encode()).hexdigest()
+        self.spending = {}  # (category, 'YYYY-MM') -> total expenses
 
     def check_password(self, password):
-        return self._hash_password(password) == self.password
+        return PasswordHasher.check(password, self.password)
 
     def set_budget(self, category, amount):
         self.budgets[category] = amount
@@ -28,188 +145,1175 @@ class User:
     def get_budget(self, category):
         return self.budgets.get(category, 0)
 
+    def add_spending(self, category, month, amount):
+        key = (category, month)
+        self.spending[key] = self.spending.get(key, 0) + amount
+
+    def get_spending(self, category, month):
+        return self.spending.get((category, month), 0)
+
 class Transaction:
-    def __init__(self, amount, category, date, transaction_type):
+    __slots__ = ('id', 'amount', 'category', 'date', 'transaction_type')
+
+    def __init__(self, amount, category, date, transaction_type, transaction_id=None):
+        self.id = transaction_id
         self.amount = amount
         self.category = category
         self.date = date
         self.transaction_type = transaction_type  # 'income' or 'expense'
 
+class TransactionRow:
+    # Lightweight row view into a TransactionStore, exposing the same
+    # attributes as Transaction without copying the row out of the arrays
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    @property
+    def id(self):
+        return self._store.ids[self._index]
+
+    @property
+    def amount(self):
+        return self._store.amounts[self._index]
+
+    @property
+    def category(self):
+        return self._store.category_names[self._store.categories[self._index]]
+
+    @property
+    def date(self):
+        return datetime.date.fromordinal(self._store.dates[self._index])
+
+    @property
+    def transaction_type(self):
+        return TransactionStore.TYPES[self._store.types[self._index]]
+
+class TransactionStore:
+    # Columnar, date-ordered copy of a user's transactions: amounts as doubles,
+    # dates as proleptic ordinals and category/type as small integer codes, so a
+    # million rows take roughly 25 MB and range scans walk contiguous arrays.
+    # It backs Analytics; reports read the monthly rollup instead, which needs
+    # no per-row scan for whole months.
+    TYPES = ('income', 'expense')
+
+    def __init__(self):
+        self.ids = array.array('q')
+        self.amounts = array.array('d')
+        self.dates = array.array('i')
+        self.categories = array.array('I')
+        self.types = array.array('b')
+        self.category_names = []
+        self._category_codes = {}
+
+    @classmethod
+    def load(cls, conn, username, chunk_size=10000):
+        store = cls()
+        cursor = conn.execute("""SELECT id, amount, category, date, type FROM transactions
+                              WHERE username = ? ORDER BY date, id""", (username,))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return store
+            for transaction_id, amount, category, date, transaction_type in rows:
+                store.ids.append(transaction_id)
+                store.amounts.append(amount)
+                store.dates.append(datetime.date.fromisoformat(date).toordinal())
+                store.categories.append(store.category_code(category))
+                store.types.append(cls.type_code(transaction_type))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("transaction index out of range")
+        return TransactionRow(self, index)
+
+    def __iter__(self):
+        return (TransactionRow(self, index) for index in range(len(self)))
+
+    @property
+    def nbytes(self):
+        return sum(column.itemsize * len(column)
+                   for column in (self.ids, self.amounts, self.dates, self.categories, self.types))
+
+    def category_code(self, category):
+        code = self._category_codes.get(category)
+        if code is None:
+            code = self._category_codes[category] = len(self.category_names)
+            self.category_names.append(sys.intern(category))
+        return code
+
+    @classmethod
+    def type_code(cls, transaction_type):
+        # Older databases may hold types such as 'Expense'; like reports, treat
+        # anything that is not 'income' as an expense
+        return 0 if transaction_type == 'income' else 1
+
+    def find_category(self, category):
+        return self._category_codes.get(category)
+
+    def append(self, amount, category, date, transaction_type, transaction_id=None):
+        # Keeps date order; appending in date order is the common, O(1) case
+        ordinal = date.toordinal()
+        index = bisect.bisect_right(self.dates, ordinal) if self.dates and ordinal < self.dates[-1] else len(self)
+        values = (-1 if transaction_id is None else transaction_id, amount, ordinal,
+                  self.category_code(category), self.type_code(transaction_type))
+        extended = []
+        try:
+            for column, value in zip((self.ids, self.amounts, self.dates, self.categories, self.types), values):
+                column.insert(index, value)
+                extended.append(column)
+        except BufferError:
+            # An exported column (e.g. wrapped by Analytics) cannot resize; undo the
+            # columns already extended so the store stays consistent
+            for column in extended:
+                del column[index]
+            raise
+
+    def date_range(self, start_date=None, end_date=None):
+        # Index bounds [lo, hi) of the rows dated within start_date..end_date
+        lo = 0 if start_date is None else bisect.bisect_left(self.dates, start_date.toordinal())
+        hi = len(self) if end_date is None else bisect.bisect_right(self.dates, end_date.toordinal())
+        return lo, hi
+
+class TransactionView:
+    # Read-only, paginated view over a user's rows in the transactions table.
+    # Pages are fetched on demand so logging in never loads the full history.
+    def __init__(self, conn, username, page_size=100, max_cached_pages=8):
+        self.conn = conn
+        self.username = username
+        self.page_size = page_size
+        self.max_cached_pages = max_cached_pages
+        self._pages = {}
+        self._count = None
+
+    def __len__(self):
+        if self._count is None:
+            self._count = self.conn.execute("SELECT COUNT(*) FROM transactions WHERE username = ?",
+                                            (self.username,)).fetchone()[0]
+        return self._count
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("transaction index out of range")
+        page_number, offset = divmod(index, self.page_size)
+        return self.page(page_number)[offset]
+
+    def __iter__(self):
+        # Keyset pagination on (date, id) keeps each page an index range scan
+        last_key = None
+        while True:
+            if last_key is None:
+                rows = self.conn.execute("""SELECT id, amount, category, date, type FROM transactions
+                                         WHERE username = ? ORDER BY date, id LIMIT ?""",
+                                         (self.username, self.page_size)).fetchall()
+            else:
+                rows = self.conn.execute("""SELECT id, amount, category, date, type FROM transactions
+                                         WHERE username = ? AND (date, id) > (?, ?)
+                                         ORDER BY date, id LIMIT ?""",
+                                         (self.username, last_key[0], last_key[1], self.page_size)).fetchall()
+            for row in rows:
+                yield self._to_transaction(row)
+            if len(rows) < self.page_size:
+                return
+            last_key = (rows[-1][3], rows[-1][0])
+
+    def page(self, page_number):
+        if page_number not in self._pages:
+            rows = self.conn.execute("""SELECT id, amount, category, date, type FROM transactions
+                                     WHERE username = ? ORDER BY date, id LIMIT ? OFFSET ?""",
+                                     (self.username, self.page_size, page_number * self.page_size)).fetchall()
+            if len(self._pages) >= self.max_cached_pages:
+                del self._pages[next(iter(self._pages))]
+            self._pages[page_number] = [self._to_transaction(row) for row in rows]
+        return self._pages[page_number]
+
+    def invalidate(self):
+        self._pages.clear()
+        self._count = None
+
+    def _to_transaction(self, row):
+        transaction_id, amount, category, date, transaction_type = row
+        return Transaction(amount, category, datetime.date.fromisoformat(date), transaction_type, transaction_id)
+
+class StorageConfig:
+    # Connection settings applied to every SQLite connection the app opens.
+    # WAL lets readers run alongside a writer; synchronous=NORMAL is durable
+    # across application crashes in WAL mode and skips an fsync per commit.
+    def __init__(self, journal_mode='wal', synchronous='normal', cache_size=-16000,
+                 mmap_size=64 * 1024 * 1024, busy_timeout=5000, pool_size=4):
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size = cache_size  # pages, or KiB when negative
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout  # milliseconds
+        self.pool_size = pool_size
+
+    def connect(self, db_name):
+        conn = sqlite3.connect(db_name, timeout=self.busy_timeout / 1000, check_same_thread=False)
+        self.apply(conn)
+        return conn
+
+    def apply(self, conn):
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        if self.journal_mode:
+            conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        if self.synchronous:
+            conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+
+class ConnectionPool:
+    # Small thread-safe pool of configured connections. Connections are opened
+    # lazily up to `size`; further callers wait for one to be returned.
+    def __init__(self, db_name, config):
+        self.db_name = db_name
+        self.config = config
+        self.size = max(1, config.pool_size)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._connections = []
+        self._on_connect = None
+
+    def configure_connections(self, callback):
+        # Runs callback(conn) on every pooled connection, now and when opened later
+        with self._lock:
+            self._on_connect = callback
+            for conn in self._connections:
+                callback(conn)
+
+    @contextlib.contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                # A close() while the connection was out has closed it; drop it
+                # rather than hand a closed handle to the next caller
+                if any(conn is pooled for pooled in self._connections):
+                    if conn.in_transaction:
+                        conn.rollback()
+                    self._idle.put(conn)
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                conn = self.config.connect(self.db_name)
+                if self._on_connect is not None:
+                    self._on_connect(conn)
+                self._connections.append(conn)
+                return conn
+        try:
+            return self._idle.get(timeout=self.config.busy_timeout / 1000)
+        except queue.Empty:
+            raise sqlite3.OperationalError("timed out waiting for a pooled connection") from None
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+            self._opened = 0
+            self._idle = queue.LifoQueue()
+
+class ReportCategory:
+    __slots__ = ('category', 'amount', 'share', 'budget')
+
+    def __init__(self, category, amount, share, budget=0):
+        self.category = category
+        self.amount = amount
+        self.share = share  # fraction of total expenses
+        self.budget = budget
+
+    @property
+    def variance(self):
+        # Budget left over (negative when over budget); None without a budget
+        return self.budget - self.amount if self.budget > 0 else None
+
+    def to_dict(self):
+        return {'category': self.category, 'amount': self.amount, 'share': self.share,
+                'budget': self.budget, 'variance': self.variance}
+
+class Report:
+    # Result of FinanceApp.generate_report. Reports may be shared through the
+    # report cache, so treat them as read-only.
+    # One table: 'total' rows carry income, expenses and savings in `amount`,
+    # 'category' rows the expense breakdown; every row repeats the period
+    CSV_COLUMNS = ['start_date', 'end_date', 'row', 'category', 'amount', 'share', 'budget', 'variance']
+
+    def __init__(self, start_date, end_date, total_income, total_expenses, categories):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.total_income = total_income
+        self.total_expenses = total_expenses
+        self.categories = categories  # ReportCategory rows, largest expense first
+
+    @property
+    def savings(self):
+        return self.total_income - self.total_expenses
+
+    def to_dict(self):
+        return {'start_date': self.start_date.isoformat(), 'end_date': self.end_date.isoformat(),
+                'total_income': self.total_income, 'total_expenses': self.total_expenses,
+                'savings': self.savings, 'categories': [line.to_dict() for line in self.categories]}
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+    def to_csv(self):
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=self.CSV_COLUMNS)
+        writer.writeheader()
+        period = {'start_date': self.start_date.isoformat(), 'end_date': self.end_date.isoformat()}
+        for name, amount in (('income', self.total_income), ('expenses', self.total_expenses),
+                             ('savings', self.savings)):
+            writer.writerow(dict(period, row='total', category=name, amount=amount))
+        writer.writerows(dict(period, row='category', **line.to_dict()) for line in self.categories)
+        return out.getvalue()
+
+    def render(self):
+        lines = [f"\nFinancial Report ({self.start_date} to {self.end_date}):",
+                 f"Total Income: ${self.total_income:.2f}",
+                 f"Total Expenses: ${self.total_expenses:.2f}",
+                 f"Savings: ${self.savings:.2f}",
+                 "\nExpense Breakdown by Category:"]
+        for line in self.categories:
+            lines.append(f"{line.category}: ${line.amount:.2f} ({line.share * 100:.1f}%)")
+            if line.budget > 0:
+                lines.append(f"  Budget: ${line.budget:.2f} ({'Over' if line.amount > line.budget else 'Under'} "
+                             f"by ${abs(line.variance):.2f})")
+        return '\n'.join(lines)
+
+    def __str__(self):
+        return self.render()
+
+class ReportCache:
+    # Size-bounded LRU cache of report results keyed by (username, kind,
+    # start_date, end_date). Each entry remembers the categories it covers so
+    # writes can drop only the entries whose date range or categories they touch.
+    # Writes made through another FinanceApp instance are not seen; share one
+    # ReportCache between instances that write to the same database.
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, username, kind, start_date, end_date):
+        key = (username, kind, start_date, end_date)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, username, kind, start_date, end_date, value, categories=()):
+        key = (username, kind, start_date, end_date)
+        with self._lock:
+            self._entries[key] = (value, frozenset(categories))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_dates(self, username, start_date, end_date=None):
+        # Drops the user's entries whose range overlaps start_date..end_date
+        end_date = end_date or start_date
+        self._invalidate(lambda key, categories: key[0] == username and key[2] <= end_date and start_date <= key[3])
+
+    def invalidate_category(self, username, category):
+        self._invalidate(lambda key, categories: key[0] == username and category in categories)
+
+    def clear(self):
+        self._invalidate(lambda key, categories: True)
+
+    def _invalidate(self, matches):
+        with self._lock:
+            stale = [key for key, (_, categories) in self._entries.items() if matches(key, categories)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self._entries), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / lookups if lookups else 0.0,
+                    'evictions': self.evictions, 'invalidations': self.invalidations}
+
+class Instrumentation:
+    # Opt-in runtime statistics, enabled with FinanceApp.enable_instrumentation().
+    # Operation latencies come from the instrumented FinanceApp methods. SQL
+    # statement counts come from the sqlite3 trace callback; a trigger run is
+    # counted again under the statement that fired it. Statement time and VM
+    # instructions (a proxy for rows scanned) come from the progress handler,
+    # which fires every `progress_interval` instructions, so very short
+    # statements may show no time at all.
+    LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000)
+    _LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+    def __init__(self, progress_interval=1000):
+        self.progress_interval = progress_interval
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.operations = {}
+            self.statements = {}
+            self.commits = 0
+            self.vm_instructions = 0
+
+    def record_operation(self, name, seconds):
+        milliseconds = seconds * 1000
+        with self._lock:
+            operation = self.operations.get(name)
+            if operation is None:
+                operation = self.operations[name] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                                     'buckets': [0] * (len(self.LATENCY_BUCKETS_MS) + 1)}
+            operation['count'] += 1
+            operation['total_ms'] += milliseconds
+            operation['max_ms'] = max(operation['max_ms'], milliseconds)
+            operation['buckets'][bisect.bisect_left(self.LATENCY_BUCKETS_MS, milliseconds)] += 1
+
+    def attach(self, conn):
+        # Each connection tracks which statement it is running; totals are shared
+        state = {'statement': None, 'tick': 0.0}
+
+        def trace(sql):
+            statement = ' '.join(self._LITERALS.sub('?', sql).split())
+            with self._lock:
+                if statement not in self.statements:
+                    self.statements[statement] = {'count': 0, 'total_ms': 0.0}
+                self.statements[statement]['count'] += 1
+                if statement == 'COMMIT':
+                    self.commits += 1
+            state['statement'] = statement
+            state['tick'] = time.perf_counter()
+
+        def progress():
+            now = time.perf_counter()
+            with self._lock:
+                self.vm_instructions += self.progress_interval
+                if state['statement'] is not None:
+                    self.statements[state['statement']]['total_ms'] += (now - state['tick']) * 1000
+            state['tick'] = now
+            return 0
+
+        conn.set_trace_callback(trace)
+        conn.set_progress_handler(progress, self.progress_interval)
+
+    @staticmethod
+    def detach(conn):
+        conn.set_trace_callback(None)
+        conn.set_progress_handler(None, 0)
+
+    def stats(self):
+        labels = [f"<={bound}ms" for bound in self.LATENCY_BUCKETS_MS] + [f">{self.LATENCY_BUCKETS_MS[-1]}ms"]
+        with self._lock:
+            operations = {name: {'count': op['count'], 'total_ms': op['total_ms'],
+                                 'mean_ms': op['total_ms'] / op['count'], 'max_ms': op['max_ms'],
+                                 'histogram': {label: count for label, count in zip(labels, op['buckets']) if count}}
+                          for name, op in self.operations.items()}
+            statements = {sql: dict(statement) for sql, statement in self.statements.items()}
+            return {'enabled': True, 'operations': operations, 'statements': statements,
+                    'statement_count': sum(statement['count'] for statement in statements.values()),
+                    'commits': self.commits, 'vm_instructions': self.vm_instructions}
+
+def instrumented(method):
+    # Times the method when the app has instrumentation enabled; otherwise the
+    # only overhead is one attribute check
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.instrumentation is None:
+            return method(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.instrumentation.record_operation(method.__name__, time.perf_counter() - start)
+    return wrapper
+
 class FinanceApp:
-    def __init__(self, db_name='finance.db'):
+    def __init__(self, db_name='finance.db', config=None, report_cache=None, verbose=True, hasher=None):
         self.db_name = db_name
-        self.conn = sqlite3.connect(self.db_name)
+        self.hasher = hasher or PasswordHasher()
+        self.verbose = verbose  # print status messages; services run with this off
+        self.config = config or StorageConfig()
+        self.conn = self.config.connect(self.db_name)
         self.cursor = self.conn.cursor()
+        self.pool = ConnectionPool(self.db_name, self.config)
+        self.report_cache = report_cache if report_cache is not None else ReportCache()
+        self.instrumentation = None
         self.current_user = None
         self.setup_database()
 
+    def _notify(self, message):
+        if self.verbose:
+            print(message)
+
+    def enable_instrumentation(self, progress_interval=1000):
+        if self.instrumentation is None:
+            self.instrumentation = Instrumentation(progress_interval)
+            self.instrumentation.attach(self.conn)
+            self.pool.configure_connections(self.instrumentation.attach)
+        return self.instrumentation
+
+    def disable_instrumentation(self):
+        if self.instrumentation is not None:
+            Instrumentation.detach(self.conn)
+            self.pool.configure_connections(Instrumentation.detach)
+            self.instrumentation = None
+
+    def stats(self):
+        stats = self.instrumentation.stats() if self.instrumentation is not None else {'enabled': False}
+        stats['report_cache'] = self.report_cache.stats()
+        return stats
+
+    def close(self):
+        # The shared cursor can pin a statement (e.g. after executemany), which
+        # would keep the connection open and leave the WAL file behind
+        self.cursor.close()
+        self.pool.close()
+        self.conn.close()
+
     def setup_database(self):
         self.cursor.execute('''CREATE TABLE IF NOT EXISTS users
                             (username TEXT PRIMARY KEY, password TEXT)''')
         self.cursor.execute('''CREATE TABLE IF NOT EXISTS transactions
-                            (username TEXT, amount REAL, category TEXT, date TEXT, type TEXT)''')
+                            (id INTEGER PRIMARY KEY, username TEXT, amount REAL, category TEXT, date TEXT, type TEXT)''')
+        self._migrate_transaction_ids()
+        self.cursor.execute('''CREATE INDEX IF NOT EXISTS idx_transactions_user_date
+                            ON transactions (username, date)''')
+        self._setup_monthly_rollup()
         self.cursor.execute('''CREATE TABLE IF NOT EXISTS budgets
                             (username TEXT, category TEXT, amount REAL)''')
+        self._migrate_budget_keys()
         self.conn.commit()
 
+    def _migrate_budget_keys(self):
+        # INSERT OR REPLACE in set_budget needs a unique key to replace on;
+        # older databases may hold several rows per category, keep the newest
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_budgets_user_category'")
+        if self.cursor.fetchone():
+            return
+        self.cursor.execute('''DELETE FROM budgets WHERE rowid NOT IN
+                            (SELECT MAX(rowid) FROM budgets GROUP BY username, category)''')
+        self.cursor.execute("CREATE UNIQUE INDEX idx_budgets_user_category ON budgets (username, category)")
+
+    def _setup_monthly_rollup(self):
+        # Per (username, month, category, type) sums kept current by triggers,
+        # so every insert, update and delete adjusts exactly the buckets it touches
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'monthly_rollup'")
+        exists = self.cursor.fetchone() is not None
+        self.cursor.execute('''CREATE TABLE IF NOT EXISTS monthly_rollup
+                            (username TEXT, month TEXT, category TEXT, type TEXT, total REAL, count INTEGER,
+                             PRIMARY KEY (username, month, category, type))''')
+        if not exists:
+            self.cursor.execute('''INSERT INTO monthly_rollup
+                                SELECT username, substr(date, 1, 7), category, type, SUM(amount), COUNT(*)
+                                FROM transactions GROUP BY username, substr(date, 1, 7), category, type''')
+        self.cursor.execute('''CREATE TRIGGER IF NOT EXISTS monthly_rollup_insert AFTER INSERT ON transactions
+                            BEGIN
+                                INSERT INTO monthly_rollup
+                                VALUES (NEW.username, substr(NEW.date, 1, 7), NEW.category, NEW.type, NEW.amount, 1)
+                                ON CONFLICT (username, month, category, type)
+                                DO UPDATE SET total = total + excluded.total, count = count + 1;
+                            END''')
+        self.cursor.execute('''CREATE TRIGGER IF NOT EXISTS monthly_rollup_delete AFTER DELETE ON transactions
+                            BEGIN
+                                UPDATE monthly_rollup SET total = total - OLD.amount, count = count - 1
+                                WHERE username = OLD.username AND month = substr(OLD.date, 1, 7)
+                                  AND category = OLD.category AND type = OLD.type;
+                                DELETE FROM monthly_rollup
+                                WHERE username = OLD.username AND month = substr(OLD.date, 1, 7)
+                                  AND category = OLD.category AND type = OLD.type AND count <= 0;
+                            END''')
+        self.cursor.execute('''CREATE TRIGGER IF NOT EXISTS monthly_rollup_update
+                            AFTER UPDATE OF username, amount, category, date, type ON transactions
+                            BEGIN
+                                UPDATE monthly_rollup SET total = total - OLD.amount, count = count - 1
+                                WHERE username = OLD.username AND month = substr(OLD.date, 1, 7)
+                                  AND category = OLD.category AND type = OLD.type;
+                                DELETE FROM monthly_rollup
+                                WHERE username = OLD.username AND month = substr(OLD.date, 1, 7)
+                                  AND category = OLD.category AND type = OLD.type AND count <= 0;
+                                INSERT INTO monthly_rollup
+                                VALUES (NEW.username, substr(NEW.date, 1, 7), NEW.category, NEW.type, NEW.amount, 1)
+                                ON CONFLICT (username, month, category, type)
+                                DO UPDATE SET total = total + excluded.total, count = count + 1;
+                            END''')
+
+    def _migrate_transaction_ids(self):
+        # Databases created before transactions had an id column are rebuilt,
+        # keeping each row's existing rowid as its new primary key
+        self.cursor.execute("PRAGMA table_info(transactions)")
+        if 'id' in [column[1] for column in self.cursor.fetchall()]:
+            return
+        self.cursor.execute('''CREATE TABLE transactions_migrated
+                            (id INTEGER PRIMARY KEY, username TEXT, amount REAL, category TEXT, date TEXT, type TEXT)''')
+        self.cursor.execute('''INSERT INTO transactions_migrated (id, username, amount, category, date, type)
+                            SELECT rowid, username, amount, category, date, type FROM transactions''')
+        self.cursor.execute("DROP TABLE transactions")
+        self.cursor.execute("ALTER TABLE transactions_migrated RENAME TO transactions")
+
+    @instrumented
     def register_user(self, username, password):
         try:
-            user = User(username, password)
-            self.cursor.execute("INSERT INTO users VALUES (?, ?)", (username, user.password))
+            self.cursor.execute("INSERT INTO users VALUES (?, ?)", (username, self.hasher.hash(password)))
             self.conn.commit()
-            print("User registered successfully.")
+            self._notify("User registered successfully.")
             return True
         except sqlite3.IntegrityError:
-            print("Username already exists.")
+            self._notify("Username already exists.")
             return False
 
+    @instrumented
     def login(self, username, password):
         self.cursor.execute("SELECT password FROM users WHERE username = ?", (username,))
         result = self.cursor.fetchone()
-        if result and result[0] == User(username, password).password:
-            self.current_user = User(username, password)
+        if result and self.hasher.verify(password, result[0]):
+            password_hash = result[0]
+            if self.hasher.needs_rehash(password_hash):
+                # Legacy and outdated hashes are upgraded while the password is at hand
+                password_hash = self.hasher.hash(password)
+                self.cursor.execute("UPDATE users SET password = ? WHERE username = ?", (password_hash, username))
+                self.conn.commit()
+            self.current_user = User(username, password_hash)
             self._load_user_data()
-            print(f"Welcome, {username}!")
+            self._notify(f"Welcome, {username}!")
             return True
-        print("Invalid username or password.")
+        if not result:
+            self.hasher.check_missing(password)
+        self._notify("Invalid username or password.")
         return False
 
     def _load_user_data(self):
-        # Load transactions
-        self.cursor.execute("SELECT amount, category, date, type FROM transactions WHERE username = ?", (self.current_user.username,))
-        for row in self.cursor.fetchall():
-            self.current_user.transactions.append(Transaction(*row))
-        
+        # Transactions are paged in lazily from the database
+        self.current_user.transactions = TransactionView(self.conn, self.current_user.username)
+        self.current_user.store = None
+
         # Load budgets
         self.cursor.execute("SELECT category, amount FROM budgets WHERE username = ?", (self.current_user.username,))
         for category, amount in self.cursor.fetchall():
             self.current_user.budgets[category] = amount
 
+        self._load_spending()
+
+    def _load_spending(self):
+        # Rebuilt from the monthly rollup, so this costs months x categories, not transactions
+        self.current_user.spending = {}
+        self.cursor.execute("SELECT category, month, total FROM monthly_rollup WHERE username = ? AND type = 'expense'",
+                            (self.current_user.username,))
+        for category, month, total in self.cursor.fetchall():
+            self.current_user.add_spending(category, month, total)
+
+    @instrumented
+    def transaction_store(self):
+        if not self.current_user:
+            self._notify("Please log in first.")
+            return
+        if self.current_user.store is None:
+            self.current_user.store = TransactionStore.load(self.conn, self.current_user.username)
+        return self.current_user.store
+
+    def analytics(self):
+        # NumPy is only needed for analytics, so it is imported on first use
+        from finance_analytics import Analytics
+        store = self.transaction_store()
+        return Analytics(store) if store is not None else None
+
+    def _invalidate_transactions(self):
+        self.current_user.transactions.invalidate()
+        self.current_user.store = None
+
+    @instrumented
     def add_transaction(self, amount, category, date, transaction_type):
         if not self.current_user:
-            print("Please log in first.")
+            self._notify("Please log in first.")
             return
-        transaction = Transaction(amount, category, date, transaction_type)
-        self.current_user.transactions.append(transaction)
-        self.cursor.execute("INSERT INTO transactions VALUES (?, ?, ?, ?, ?)",
+        values = _validate_transaction((amount, category, date, transaction_type))
+        if values is None:
+            self._notify("Invalid transaction: expected an amount, a category, a date and 'income' or 'expense'.")
+            return False
+        amount, category, date, transaction_type = values
+        self.cursor.execute("INSERT INTO transactions (username, amount, category, date, type) VALUES (?, ?, ?, ?, ?)",
                             (self.current_user.username, amount, category, date.isoformat(), transaction_type))
         self.conn.commit()
-        print("Transaction added successfully.")
+        self.current_user.transactions.invalidate()
+        self.report_cache.invalidate_dates(self.current_user.username, date)
+        if self.current_user.store is not None:
+            try:
+                self.current_user.store.append(amount, category, date, transaction_type, self.cursor.lastrowid)
+            except BufferError:
+                # Arrays shared with a live Analytics object cannot grow; reload instead
+                self.current_user.store = None
+        if transaction_type == 'expense':
+            self.current_user.add_spending(category, _month_key(date), amount)
+        self._notify("Transaction added successfully.")
         self._check_budget(category)
+        return True
+
+    @instrumented
+    def add_transactions(self, transactions, batch_size=1000):
+        # Bulk path for imports: one database transaction and one commit for the
+        # whole iterable, with budget checks deferred until every row is in
+        if not self.current_user:
+            self._notify("Please log in first.")
+            return 0
+        username = self.current_user.username
+        spending = {}
+        added = skipped = 0
+        first_date = last_date = None
+        batch = []
+        try:
+            for row in transactions:
+                values = _validate_transaction(row)
+                if values is None:
+                    skipped += 1
+                    continue
+                amount, category, date, transaction_type = values
+                batch.append((username, amount, category, date.isoformat(), transaction_type))
+                if first_date is None or date < first_date:
+                    first_date = date
+                if last_date is None or date > last_date:
+                    last_date = date
+                if transaction_type == 'expense':
+                    key = (category, _month_key(date))
+                    spending[key] = spending.get(key, 0) + amount
+                if len(batch) >= batch_size:
+                    self._insert_transactions(batch)
+                    added += len(batch)
+                    batch = []
+            if batch:
+                self._insert_transactions(batch)
+                added += len(batch)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        self._invalidate_transactions()
+        if first_date is not None:
+            self.report_cache.invalidate_dates(username, first_date, last_date)
+        for (category, month), amount in spending.items():
+            self.current_user.add_spending(category, month, amount)
+        self._notify(f"{added} transactions added successfully.")
+        if skipped:
+            self._notify(f"Skipped {skipped} invalid transactions.")
+        for category in {category for category, _ in spending}:
+            self._check_budget(category)
+        return added
+
+    def _insert_transactions(self, rows):
+        self.cursor.executemany("INSERT INTO transactions (username, amount, category, date, type) VALUES (?, ?, ?, ?, ?)",
+                                rows)
 
     def _check_budget(self, category):
         budget = self.current_user.get_budget(category)
         if budget > 0:
-            total_expenses = sum(t.amount for t in self.current_user.transactions 
-                                 if t.category == category and t.transaction_type == 'expense' 
-                                 and t.date.strftime('%Y-%m') == datetime.date.today().strftime('%Y-%m'))
-            if total_expenses > budget:
-                print(f"Warning: You have exceeded your budget for {category}!")
+            if self.current_user.get_spending(category, _month_key(datetime.date.today())) > budget:
+                self._notify(f"Warning: You have exceeded your budget for {category}!")
+
+    @instrumented
+    def get_budget_status(self, category=None, month=None):
+        if not self.current_user:
+            self._notify("Please log in first.")
+            return
+        if month is None:
+            month = _month_key(datetime.date.today())
+        elif isinstance(month, datetime.date):
+            month = _month_key(month)
+        categories = [category] if category is not None else sorted(self.current_user.budgets)
+        statuses = []
+        for name in categories:
+            budget = self.current_user.get_budget(name)
+            spent = self.current_user.get_spending(name, month)
+            statuses.append({'category': name, 'month': month, 'budget': budget, 'spent': spent,
+                             'remaining': budget - spent, 'exceeded': budget > 0 and spent > budget})
+        return statuses[0] if category is not None else statuses
 
+    @instrumented
     def update_transaction(self, index, amount, category, date, transaction_type):
         if not self.current_user:
-            print("Please log in first.")
+            self._notify("Please log in first.")
             return
         if 0 <= index < len(self.current_user.transactions):
             old_transaction = self.current_user.transactions[index]
-            new_transaction = Transaction(amount, category, date, transaction_type)
-            self.current_user.transactions[index] = new_transaction
             self.cursor.execute("""UPDATE transactions 
                                 SET amount = ?, category = ?, date = ?, type = ?
-                                WHERE username = ? AND amount = ? AND category = ? AND date = ? AND type = ?""",
+                                WHERE id = ? AND username = ?""",
                                 (amount, category, date.isoformat(), transaction_type,
-                                 self.current_user.username, old_transaction.amount, old_transaction.category,
-                                 old_transaction.date.isoformat(), old_transaction.transaction_type))
+                                 old_transaction.id, self.current_user.username))
             self.conn.commit()
-            print("Transaction updated successfully.")
+            self._invalidate_transactions()
+            if self.cursor.rowcount == 0:
+                # Changed by another connection since this user's view was loaded
+                self._notify("Transaction no longer exists.")
+                return False
+            self.report_cache.invalidate_dates(self.current_user.username, old_transaction.date)
+            self.report_cache.invalidate_dates(self.current_user.username, date)
+            if old_transaction.transaction_type == 'expense':
+                self.current_user.add_spending(old_transaction.category, _month_key(old_transaction.date),
+                                               -old_transaction.amount)
+            if transaction_type == 'expense':
+                self.current_user.add_spending(category, _month_key(date), amount)
+            self._notify("Transaction updated successfully.")
             self._check_budget(category)
-        else:
-            print("Invalid transaction index.")
+            return True
+        self._notify("Invalid transaction index.")
+        return False
 
+    @instrumented
     def delete_transaction(self, index):
         if not self.current_user:
-            print("Please log in first.")
+            self._notify("Please log in first.")
             return
         if 0 <= index < len(self.current_user.transactions):
             transaction = self.current_user.transactions[index]
-            del self.current_user.transactions[index]
-            self.cursor.execute("""DELETE FROM transactions 
-                                WHERE username = ? AND amount = ? AND category = ? AND date = ? AND type = ?""",
-                                (self.current_user.username, transaction.amount, transaction.category,
-                                 transaction.date.isoformat(), transaction.transaction_type))
+            self.cursor.execute("DELETE FROM transactions WHERE id = ? AND username = ?",
+                                (transaction.id, self.current_user.username))
             self.conn.commit()
-            print("Transaction deleted successfully.")
-        else:
-            print("Invalid transaction index.")
+            self._invalidate_transactions()
+            if self.cursor.rowcount == 0:
+                self._notify("Transaction no longer exists.")
+                return False
+            self.report_cache.invalidate_dates(self.current_user.username, transaction.date)
+            if transaction.transaction_type == 'expense':
+                self.current_user.add_spending(transaction.category, _month_key(transaction.date), -transaction.amount)
+            self._notify("Transaction deleted successfully.")
+            return True
+        self._notify("Invalid transaction index.")
+        return False
 
+    @instrumented
     def generate_report(self, start_date, end_date):
+        # Returns a Report; rendering and printing are left to the caller
         if not self.current_user:
-            print("Please log in first.")
+            self._notify("Please log in first.")
             return
-        
+        username = self.current_user.username
+        report = self.report_cache.get(username, 'report', start_date, end_date)
+        if report is not None:
+            return report
+
         total_income = 0
         total_expenses = 0
         category_expenses = {}
-        
-        for transaction in self.current_user.transactions:
-            if start_date <= transaction.date <= end_date:
-                if transaction.transaction_type == 'income':
-                    total_income += transaction.amount
-                else:
-                    total_expenses += transaction.amount
-                    category_expenses[transaction.category] = category_expenses.get(transaction.category, 0) + transaction.amount
-        
-        savings = total_income - total_expenses
-        print(f"\nFinancial Report ({start_date} to {end_date}):")
-        print(f"Total Income: ${total_income:.2f}")
-        print(f"Total Expenses: ${total_expenses:.2f}")
-        print(f"Savings: ${savings:.2f}")
-        
-        print("\nExpense Breakdown by Category:")
-        for category, amount in category_expenses.items():
-            print(f"{category}: ${amount:.2f} ({amount/total_expenses*100:.1f}%)")
-            budget = self.current_user.get_budget(category)
-            if budget > 0:
-                print(f"  Budget: ${budget:.2f} ({'Over' if amount > budget else 'Under'} by ${abs(budget - amount):.2f})")
-
-    def list_transactions(self):
+        for (category, transaction_type), amount in self._report_sums(start_date, end_date).items():
+            if transaction_type == 'income':
+                total_income += amount
+            else:
+                total_expenses += amount
+                category_expenses[category] = category_expenses.get(category, 0) + amount
+
+        categories = [ReportCategory(category, amount, amount / total_expenses, self.current_user.get_budget(category))
+                      for category, amount in sorted(category_expenses.items(), key=lambda item: (-item[1], item[0]))]
+        report = Report(start_date, end_date, total_income, total_expenses, categories)
+        self.report_cache.put(username, 'report', start_date, end_date, report, category_expenses)
+        return report
+
+    def _report_sums(self, start_date, end_date):
+        # Whole months are read from the rollup table; only the partial months
+        # at either end of the range touch individual transaction rows
+        username = self.current_user.username
+        end_exclusive = end_date + datetime.timedelta(days=1)
+        first_full = start_date if start_date.day == 1 else _next_month(start_date)
+        after_full = end_exclusive.replace(day=1)
+        if first_full >= after_full:
+            ranges = [(start_date, end_exclusive)]
+            months = None
+        else:
+            ranges = [(start_date, first_full), (after_full, end_exclusive)]
+            months = (first_full.strftime('%Y-%m'), after_full.strftime('%Y-%m'))
+
+        sums = {}
+        rows = []
+        with self.pool.connection() as conn:
+            if months:
+                rows.extend(conn.execute("""SELECT category, type, SUM(total) FROM monthly_rollup
+                                         WHERE username = ? AND month >= ? AND month < ?
+                                         GROUP BY category, type""", (username, *months)))
+            for range_start, range_end in ranges:
+                if range_start >= range_end:
+                    continue
+                rows.extend(conn.execute("""SELECT category, type, SUM(amount) FROM transactions
+                                         WHERE username = ? AND date >= ? AND date < ?
+                                         GROUP BY category, type""",
+                                         (username, range_start.isoformat(), range_end.isoformat())))
+        for category, transaction_type, amount in rows:
+            key = (category, transaction_type)
+            sums[key] = sums.get(key, 0) + amount
+        return sums
+
+    @instrumented
+    def list_transactions(self, page=None):
         if not self.current_user:
-            print("Please log in first.")
+            self._notify("Please log in first.")
             return
-        if not self.current_user.transactions:
-            print("No transactions found.")
+        transactions = self.current_user.transactions
+        if not transactions:
+            self._notify("No transactions found.")
             return
-        for i, t in enumerate(self.current_user.transactions):
+        if page is None:
+            rows = enumerate(transactions)
+        else:
+            rows = enumerate(transactions.page(page), start=page * transactions.page_size)
+        for i, t in rows:
             print(f"{i}: {t.date} - {t.category} - ${t.amount:.2f} ({t.transaction_type})")
 
+    @instrumented
     def set_budget(self, category, amount):
         if not self.current_user:
-            print("Please log in first.")
+            self._notify("Please log in first.")
             return
         self.current_user.set_budget(category, amount)
         self.cursor.execute("INSERT OR REPLACE INTO budgets VALUES (?, ?, ?)",
                             (self.current_user.username, category, amount))
         self.conn.commit()
-        print(f"Budget set for {category}: ${amount:.2f}")
+        self.report_cache.invalidate_category(self.current_user.username, category)
+        self._notify(f"Budget set for {category}: ${amount:.2f}")
 
-    def backup_data(self, filename):
-        with open(filename, 'w', newline='') as csvfile:
+    @instrumented
+    def backup_data(self, filename, all_users=None, compress=None, chunk_size=1000):
+        # Rows are streamed to the file in fetchmany chunks, so memory use does
+        # not depend on table size. Scoped to the logged-in user unless all_users.
+        username = self._backup_scope(all_users)
+        if compress is None:
+            compress = filename.endswith('.gz')
+        cursor = self.conn.cursor()
+        if username is None:
+            cursor.execute("SELECT id, username, amount, category, date, type FROM transactions ORDER BY id")
+        else:
+            cursor.execute("SELECT id, username, amount, category, date, type FROM transactions WHERE username = ? ORDER BY id",
+                           (username,))
+        count = 0
+        with _open_backup(filename, 'w', compress) as csvfile:
             writer = csv.writer(csvfile)
-            writer.writerow(['username', 'amount', 'category', 'date', 'type'])
-            self.cursor.execute("SELECT * FROM transactions")
-            writer.writerows(self.cursor.fetchall())
-        print(f"Data backed up to {filename}")
+            writer.writerow(BACKUP_COLUMNS)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                count += len(rows)
+        self._notify(f"Data backed up to {filename} ({count} transactions)")
+        return count
 
-    def restore_data(self, filename):
-        with open(filename, 'r') as csvfile:
+    @instrumented
+    def restore_data(self, filename, all_users=None, chunk_size=1000):
+        # Streams the backup in chunks, converting types and skipping rows that
+        # already exist, so the same file can be restored more than once
+        username = self._backup_scope(all_users)
+        restored = skipped = invalid = 0
+        spans = {}  # username -> (first, last) ISO date restored, for cache invalidation
+        with _open_backup(filename, 'r', _is_gzip_file(filename)) as csvfile:
             reader = csv.reader(csvfile)
-            next(reader)  # Skip header row
-            self.cursor.executemany("INSERT INTO transactions VALUES (?, ?, ?, ?, ?)", reader)
+            header = next(reader, None)
+            if header is None:
+                self._notify(f"No data found in {filename}")
+                return 0
+            columns = {name: position for position, name in enumerate(header)}
+            has_ids = 'id' in columns
+            # Rows whose id is free are restored under it and rows whose id holds the
+            # same transaction are present already. Everything else (backups without
+            # ids, ids taken by a different transaction) is matched on its values;
+            # per-value counts keep genuinely repeated transactions from collapsing.
+            existing = {}  # values -> rows stored before this restore
+            seen = {}  # values -> backup rows read so far
+            inserted = {}  # values -> rows this restore has committed to the table
+            assigned = set()  # ids SQLite gave value-matched rows during this restore
+            try:
+                while True:
+                    chunk = list(itertools.islice(reader, chunk_size))
+                    if not chunk:
+                        break
+                    rows = []
+                    for record in chunk:
+                        row = _parse_backup_row(record, columns)
+                        if row is None:
+                            invalid += 1
+                        elif username is None or row[1] == username:
+                            rows.append(row)
+                    stored = self._stored_transactions([row[0] for row in rows]) if has_ids else {}
+                    new_rows = []
+                    new_rows_without_id = []
+                    for row in rows:
+                        key = row[1:]
+                        seen[key] = seen.get(key, 0) + 1
+                        if has_ids and row[0] not in stored:
+                            new_rows.append(row)
+                            continue
+                        # An id handed out earlier in this restore does not make a row
+                        # present: the backup row that owns it is a separate transaction
+                        if has_ids and stored[row[0]] == row and row[0] not in assigned:
+                            continue
+                        if key not in existing:
+                            self.cursor.execute("""SELECT COUNT(*) FROM transactions WHERE username = ? AND date = ?
+                                                AND amount = ? AND category = ? AND type = ?""",
+                                                (key[0], key[3], key[1], key[2], key[4]))
+                            existing[key] = self.cursor.fetchone()[0] - inserted.get(key, 0)
+                        if seen[key] > existing[key]:
+                            new_rows_without_id.append(key)
+                    self.cursor.executemany("""INSERT INTO transactions (id, username, amount, category, date, type)
+                                            VALUES (?, ?, ?, ?, ?, ?)""", new_rows)
+                    if has_ids:
+                        for row in new_rows_without_id:
+                            self.cursor.execute("""INSERT INTO transactions (username, amount, category, date, type)
+                                                VALUES (?, ?, ?, ?, ?)""", row)
+                            assigned.add(self.cursor.lastrowid)
+                    else:
+                        self._insert_transactions(new_rows_without_id)
+                    for row in itertools.chain((row[1:] for row in new_rows), new_rows_without_id):
+                        inserted[row] = inserted.get(row, 0) + 1
+                        first, last = spans.get(row[0], (row[3], row[3]))
+                        spans[row[0]] = (min(first, row[3]), max(last, row[3]))
+                    restored += len(new_rows) + len(new_rows_without_id)
+                    skipped += len(rows) - len(new_rows) - len(new_rows_without_id)
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+        if self.current_user:
+            self._invalidate_transactions()
+            self._load_spending()
+        for restored_username, (first, last) in spans.items():
+            self.report_cache.invalidate_dates(restored_username, datetime.date.fromisoformat(first),
+                                               datetime.date.fromisoformat(last))
+        self._notify(f"Data restored from {filename} ({restored} restored, {skipped} already present, {invalid} invalid)")
+        return restored
+
+    @instrumented
+    def snapshot_data(self, filename, pages=1024, progress=None):
+        # Consistent copy of the whole database (users, budgets and transactions)
+        # through SQLite's online backup API; copying `pages` pages per step lets
+        # other connections keep working between steps
+        self.conn.commit()
+        target = sqlite3.connect(filename)
+        try:
+            self.conn.backup(target, pages=pages, progress=progress)
+        finally:
+            target.close()
+        self._notify(f"Snapshot saved to {filename}")
+
+    @instrumented
+    def restore_snapshot(self, filename, pages=1024, progress=None):
+        if not os.path.exists(filename):
+            self._notify(f"Snapshot {filename} not found.")
+            return False
         self.conn.commit()
-        print(f"Data restored from {filename}")
+        source = sqlite3.connect(filename)
+        try:
+            source.backup(self.conn, pages=pages, progress=progress)
+        finally:
+            source.close()
+        self.setup_database()
+        self.report_cache.clear()
+        if self.current_user:
+            self.cursor.execute("SELECT 1 FROM users WHERE username = ?", (self.current_user.username,))
+            if self.cursor.fetchone():
+                self.current_user.budgets = {}
+                self._load_user_data()
+            else:
+                self.current_user = None
+        self._notify(f"Snapshot restored from {filename}")
+        return True
+
+    def _backup_scope(self, all_users):
+        if all_users is None:
+            all_users = self.current_user is None
+        return None if all_users else self.current_user.username
+
+    def _stored_transactions(self, ids):
+        # Looked up in slices: older SQLite builds allow at most 999 bound variables
+        stored = {}
+        for start in range(0, len(ids), SQLITE_MAX_VARIABLES):
+            batch = ids[start:start + SQLITE_MAX_VARIABLES]
+            self.cursor.execute(f"""SELECT id, username, amount, category, date, type FROM transactions
+                                WHERE id IN ({', '.join('?' * len(batch))})""", batch)
+            stored.update((row[0], row) for row in self.cursor.fetchall())
+        return stored
+
+SQLITE_MAX_VARIABLES = 999
+
+BACKUP_COLUMNS = ['id', 'username', 'amount', 'category', 'date', 'type']
+
+def _open_backup(filename, mode, compress):
+    if compress:
+        return gzip.open(filename, mode + 't', newline='')
+    return open(filename, mode, newline='')
+
+def _is_gzip_file(filename):
+    with open(filename, 'rb') as f:
+        return f.read(2) == b'\x1f\x8b'
+
+def _parse_backup_row(record, columns):
+    try:
+        values = _validate_transaction([record[columns[name]] for name in ('amount', 'category', 'date', 'type')])
+        username = record[columns['username']]
+        transaction_id = int(record[columns['id']]) if 'id' in columns else None
+    except (IndexError, KeyError, ValueError):
+        return None
+    if values is None or not username:
+        return None
+    amount, category, date, transaction_type = values
+    return (transaction_id, username, amount, category, date.isoformat(), transaction_type)
+
+def _validate_transaction(row):
+    # Accepts a Transaction or an (amount, category, date, type) sequence and
+    # returns the normalized values, or None when the row cannot be stored
+    if isinstance(row, Transaction):
+        row = (row.amount, row.category, row.date, row.transaction_type)
+    try:
+        amount, category, date, transaction_type = row
+        amount = float(amount)
+        if isinstance(date, str):
+            date = datetime.date.fromisoformat(date)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(date, datetime.date) or not category:
+        return None
+    if isinstance(date, datetime.datetime):
+        date = date.date()
+    transaction_type = str(transaction_type).lower()
+    if transaction_type not in ('income', 'expense'):
+        return None
+    return amount, category, date, transaction_type
+
+def _month_key(day):
+    return f"{day.year:04d}-{day.month:02d}"
+
+def _next_month(day):
+    if day.month == 12:
+        return datetime.date(day.year + 1, 1, 1)
+    return datetime.date(day.year, day.month + 1, 1)
 
 def clear_screen():
-    os.system('cls' if os.name == 'nt' else 'clear')
+    if sys.stdout.isatty():
+        os.system('cls' if os.name == 'nt' else 'clear')
 
 def print_logo():
     logo = """
@@ -239,13 +1343,231 @@ def print_menu():
     print(Fore.RED + "11. Exit")
 
 def animate_text(text):
+    if not sys.stdout.isatty():
+        print(text)
+        return
     for char in text:
         print(char, end='', flush=True)
         time.sleep(0.03)
     print()
 
-def main():
-    db_name = 'finance.db'
+def _parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {value!r}, expected YYYY-MM-DD") from None
+
+def _parse_month(value):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid month {value!r}, expected YYYY-MM") from None
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='finance_app.py', description="Personal Finance Management System")
+    parser.add_argument('--db', default='finance.db', help="SQLite database file (default: finance.db)")
+    parser.add_argument('--user', help="username to log in as")
+    parser.add_argument('--password', default=os.environ.get('FINANCE_PASSWORD'),
+                        help="password (default: $FINANCE_PASSWORD)")
+    parser.add_argument('--format', choices=['json', 'csv', 'text'], default='json', help="output format")
+    parser.add_argument('--stats', action='store_true',
+                        help="collect instrumentation and print the statistics after the last command")
+    parser.add_argument('--batch', metavar='FILE',
+                        help="run one command per line from FILE ('-' for stdin) in a single session")
+    commands = parser.add_subparsers(dest='command', metavar='command')
+
+    command = commands.add_parser('register', help="register --user with --password")
+    command.set_defaults(handler=_cli_register, login='never')
+
+    command = commands.add_parser('add', help="add a transaction")
+    command.add_argument('amount', type=float)
+    command.add_argument('category')
+    command.add_argument('date', type=_parse_date)
+    command.add_argument('type', choices=['income', 'expense'])
+    command.set_defaults(handler=_cli_add, login='required')
+
+    command = commands.add_parser('import', help="bulk import transactions from a CSV file")
+    command.add_argument('file', help="CSV with amount, category, date and type columns ('-' for stdin)")
+    command.add_argument('--batch-size', type=int, default=1000)
+    command.set_defaults(handler=_cli_import, login='required')
+
+    command = commands.add_parser('list', help="list transactions")
+    command.add_argument('--page', type=int, help="only list this page")
+    command.set_defaults(handler=_cli_list, login='required')
+
+    command = commands.add_parser('report', help="financial report for a date range")
+    command.add_argument('start_date', type=_parse_date)
+    command.add_argument('end_date', type=_parse_date)
+    command.set_defaults(handler=_cli_report, login='required')
+
+    command = commands.add_parser('budget', help="show budget status, or set a budget with CATEGORY AMOUNT")
+    command.add_argument('category', nargs='?')
+    command.add_argument('amount', nargs='?', type=float)
+    command.add_argument('--month', type=_parse_month, help="month to report spending for, as YYYY-MM (default: current month)")
+    command.set_defaults(handler=_cli_budget, login='required')
+
+    for name, handler in [('backup', _cli_backup), ('restore', _cli_restore)]:
+        command = commands.add_parser(name, help=f"{name} transactions as CSV, or the whole database with --snapshot")
+        command.add_argument('file')
+        command.add_argument('--all-users', action='store_true', default=None, help="include every user's transactions")
+        command.add_argument('--snapshot', action='store_true', help="use a SQLite snapshot of the whole database")
+        command.set_defaults(handler=handler, login='optional')
+
+    command = commands.add_parser('stats', help="operation latencies, SQL statement counts and cache statistics "
+                                                "for the commands run so far in this session")
+    command.set_defaults(handler=_cli_stats, login='never')
+    return parser
+
+def _cli_register(app, args):
+    if not args.user or args.password is None:
+        print("register: --user and --password are required")
+        return {'registered': False}
+    return {'registered': app.register_user(args.user, args.password)}
+
+def _cli_add(app, args):
+    app.add_transaction(args.amount, args.category, args.date, args.type)
+    return {'added': 1}
+
+def _cli_import(app, args):
+    source = sys.stdin if args.file == '-' else open(args.file, newline='')
+    try:
+        reader = csv.DictReader(source)
+        rows = ((row.get('amount'), row.get('category'), row.get('date'), row.get('type')) for row in reader)
+        return {'imported': app.add_transactions(rows, batch_size=args.batch_size)}
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+def _cli_list(app, args):
+    transactions = app.current_user.transactions
+    if args.page is None:
+        rows = enumerate(transactions)
+    else:
+        rows = enumerate(transactions.page(args.page), start=args.page * transactions.page_size)
+    return [{'index': i, 'id': t.id, 'date': t.date.isoformat(), 'category': t.category,
+             'amount': t.amount, 'type': t.transaction_type} for i, t in rows]
+
+def _cli_report(app, args):
+    return app.generate_report(args.start_date, args.end_date)
+
+def _cli_budget(app, args):
+    if args.amount is not None:
+        app.set_budget(args.category, args.amount)
+    return app.get_budget_status(args.category, args.month)
+
+def _cli_backup(app, args):
+    if args.snapshot:
+        app.snapshot_data(args.file)
+        return {'snapshot': args.file}
+    return {'backed_up': app.backup_data(args.file, all_users=args.all_users)}
+
+def _cli_restore(app, args):
+    if args.snapshot:
+        return {'restored': app.restore_snapshot(args.file)}
+    return {'restored': app.restore_data(args.file, all_users=args.all_users)}
+
+def _cli_stats(app, args):
+    stats = app.stats()
+    if args.format == 'json':
+        return stats
+    # CSV and text output get one flat row per operation and statement
+    rows = []
+    for name, operation in stats.get('operations', {}).items():
+        rows.append({'kind': 'operation', 'name': name, 'count': operation['count'],
+                     'total_ms': round(operation['total_ms'], 3), 'max_ms': round(operation['max_ms'], 3)})
+    for sql, statement in stats.get('statements', {}).items():
+        rows.append({'kind': 'statement', 'name': sql, 'count': statement['count'],
+                     'total_ms': round(statement['total_ms'], 3), 'max_ms': ''})
+    # Cache counters are counts, one row each, never timings
+    for name in ('hits', 'misses', 'evictions', 'invalidations', 'size'):
+        rows.append({'kind': 'report_cache', 'name': name, 'count': stats['report_cache'][name],
+                     'total_ms': '', 'max_ms': ''})
+    return rows
+
+def _write_result(result, output_format, out):
+    if isinstance(result, Report):
+        if output_format == 'json':
+            out.write(result.to_json() + '\n')
+        elif output_format == 'csv':
+            out.write(result.to_csv())
+        else:
+            out.write(result.render() + '\n')
+        return
+    if output_format == 'json':
+        out.write(json.dumps(result) + '\n')
+        return
+    rows = result if isinstance(result, list) else [result]
+    if output_format == 'csv':
+        if rows:
+            writer = csv.DictWriter(out, fieldnames=list(rows[0]), extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+        return
+    for row in rows:
+        out.write(', '.join(f"{key}: {value}" for key, value in row.items()) + '\n')
+
+def run_cli(argv, out=None):
+    # Non-interactive entry point. Results go to `out` (stdout by default) in the
+    # chosen format; the app's own status messages are sent to stderr.
+    out = out or sys.stdout
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.batch:
+        source = sys.stdin if args.batch == '-' else open(args.batch)
+        with source:
+            lines = [(number, line) for number, line in enumerate((raw.strip() for raw in source), 1)
+                     if line and not line.startswith('#')]
+        invocations = []
+        for number, line in lines:
+            invocation = parser.parse_args(shlex.split(line), namespace=argparse.Namespace(**vars(args)))
+            if not invocation.command:
+                parser.error(f"line {number}: a command is required")
+            invocations.append(invocation)
+    elif args.command:
+        invocations = [args]
+    else:
+        parser.error("a command or --batch is required")
+
+    exit_code = 0
+    with contextlib.redirect_stdout(sys.stderr):
+        app = FinanceApp(args.db)
+        if args.stats or any(invocation.command == 'stats' for invocation in invocations):
+            app.enable_instrumentation()
+        logged_in_as = None
+        try:
+            for invocation in invocations:
+                if invocation.db != args.db:
+                    print(f"{invocation.command}: --db cannot change inside a batch")
+                    exit_code = 1
+                    continue
+                # A batch line may give other credentials; log in with them rather
+                # than running the command as whoever logged in first
+                credentials = (invocation.user, invocation.password)
+                if invocation.login != 'never' and invocation.user and credentials != logged_in_as:
+                    app.current_user = logged_in_as = None
+                    if invocation.password is None or not app.login(*credentials):
+                        exit_code = 1
+                        continue
+                    logged_in_as = credentials
+                if invocation.login == 'required' and not app.current_user:
+                    print(f"{invocation.command}: login required (use --user and --password)")
+                    exit_code = 1
+                    continue
+                result = invocation.handler(app, invocation)
+                _write_result(result, invocation.format, out)
+            if args.stats:
+                _write_result(_cli_stats(app, args), args.format, out)
+        finally:
+            app.close()
+    return exit_code
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        return run_cli(argv)
+    interactive_main()
+
+def interactive_main(db_name='finance.db'):
     app = FinanceApp(db_name)
     print(Fore.GREEN + f"Data is being stored in '{db_name}'" + Style.RESET_ALL)
     
@@ -327,7 +1649,9 @@ def main():
                 continue
             start_date = datetime.datetime.strptime(input(Fore.YELLOW + "Enter start date (YYYY-MM-DD): " + Style.RESET_ALL), "%Y-%m-%d").date()
             end_date = datetime.datetime.strptime(input(Fore.YELLOW + "Enter end date (YYYY-MM-DD): " + Style.RESET_ALL), "%Y-%m-%d").date()
-            app.generate_report(start_date, end_date)
+            report = app.generate_report(start_date, end_date)
+            if report is not None:
+                print(report.render())
             input(Fore.CYAN + "Press Enter to continue...")
         
         elif choice == '8':
@@ -361,4 +1685,4 @@ def main():
             input(Fore.CYAN + "Press Enter to continue...")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,216 @@
+import argparse
+import asyncio
+import concurrent.futures
+import datetime
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+import weakref
+
+from finance_app import FinanceApp, PasswordHasher, ReportCache, StorageConfig
+
+class _SharedUser:
+    # Logged-in state for one username. Every session of that user shares it, so
+    # budgets, spending and the transaction view stay current across sessions.
+    def __init__(self, user):
+        self.user = user
+        self.lock = asyncio.Lock()
+
+class Session:
+    # One login. Calls for the same user run one at a time, while calls for
+    # different users run concurrently on the service's workers.
+    def __init__(self, service, shared):
+        self.service = service
+        self._shared = shared
+
+    @property
+    def user(self):
+        return self._shared.user
+
+    @property
+    def username(self):
+        return self.user.username
+
+    @property
+    def _lock(self):
+        return self._shared.lock
+
+    async def _call(self, name, *args, **kwargs):
+        async with self._lock:
+            return await self.service._run(self.service._call_as, self.user, name, args, kwargs)
+
+    async def _page(self, page):
+        async with self._lock:
+            return await self.service._run(self.service._page_as, self.user, page)
+
+    async def add_transaction(self, amount, category, date, transaction_type):
+        return await self._call('add_transaction', amount, category, date, transaction_type)
+
+    async def add_transactions(self, transactions, batch_size=1000):
+        return await self._call('add_transactions', list(transactions), batch_size=batch_size)
+
+    async def update_transaction(self, index, amount, category, date, transaction_type):
+        return await self._call('update_transaction', index, amount, category, date, transaction_type)
+
+    async def delete_transaction(self, index):
+        return await self._call('delete_transaction', index)
+
+    async def list_transactions(self, page=0):
+        return await self._page(page)
+
+    async def generate_report(self, start_date, end_date):
+        return await self._call('generate_report', start_date, end_date)
+
+    async def set_budget(self, category, amount):
+        return await self._call('set_budget', category, amount)
+
+    async def get_budget_status(self, category=None, month=None):
+        return await self._call('get_budget_status', category, month)
+
+class FinanceService:
+    # Asyncio front end for FinanceApp. Database work runs on a bounded thread
+    # pool; each worker thread owns a quiet FinanceApp (and so its own SQLite
+    # connections), and all workers share one ReportCache so a write through any
+    # worker invalidates reports for every session. Password hashing happens on
+    # the workers too, never on the event loop.
+    def __init__(self, db_name='finance.db', max_workers=8, config=None, hasher=None):
+        self.db_name = db_name
+        self.config = config or StorageConfig(pool_size=1)
+        self.report_cache = ReportCache()
+        self.hasher = hasher or PasswordHasher()
+        self._users = weakref.WeakValueDictionary()  # username -> _SharedUser while any session holds it
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix='finance')
+        self._local = threading.local()
+        self._apps = []
+        self._apps_lock = threading.Lock()
+        # Creates the schema once up front instead of racing in the workers
+        FinanceApp(db_name, self.config, self.report_cache, verbose=False, hasher=self.hasher).close()
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    def _app(self):
+        app = getattr(self._local, 'app', None)
+        if app is None:
+            app = self._local.app = FinanceApp(self.db_name, self.config, self.report_cache, verbose=False,
+                                                hasher=self.hasher)
+            with self._apps_lock:
+                self._apps.append(app)
+        return app
+
+    def _call_as(self, user, name, args, kwargs):
+        # Runs on a worker: borrow the thread's app for this user, then detach it
+        app = self._app()
+        user.transactions.conn = app.conn
+        app.current_user = user
+        try:
+            return getattr(app, name)(*args, **kwargs)
+        finally:
+            app.current_user = None
+
+    def _page_as(self, user, page):
+        user.transactions.conn = self._app().conn
+        return [_transaction_dict(t) for t in user.transactions.page(page)]
+
+    def _register(self, username, password):
+        return self._app().register_user(username, password)
+
+    def _login(self, username, password):
+        app = self._app()
+        try:
+            return app.current_user if app.login(username, password) else None
+        finally:
+            app.current_user = None
+
+    async def register(self, username, password):
+        return await self._run(self._register, username, password)
+
+    async def login(self, username, password):
+        user = await self._run(self._login, username, password)
+        if user is None:
+            return None
+        shared = self._users.get(username)
+        if shared is None:
+            shared = self._users[username] = _SharedUser(user)
+        return Session(self, shared)
+
+    def _close_apps(self):
+        with self._apps_lock:
+            for app in self._apps:
+                app.close()
+            self._apps = []
+
+    async def close(self):
+        # Connections belong to their worker threads' apps, so close them after
+        # the workers have finished
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+        self._close_apps()
+
+def _transaction_dict(transaction):
+    return {'id': transaction.id, 'date': transaction.date.isoformat(), 'category': transaction.category,
+            'amount': transaction.amount, 'type': transaction.transaction_type}
+
+async def _client(service, number, operations, rng, latencies):
+    # Stand-in client: registers, logs in, then mixes writes and reports
+    username = f"client{number:05d}"
+    start = time.perf_counter()
+    await service.register(username, 'secret')
+    session = await service.login(username, 'secret')
+    latencies['login'].append(time.perf_counter() - start)
+    await session.set_budget('Food', 500)
+    first_day = datetime.date(2024, 1, 1)
+    for _ in range(operations):
+        day = first_day + datetime.timedelta(days=rng.randrange(365))
+        start = time.perf_counter()
+        if rng.random() < 0.7:
+            await session.add_transaction(round(rng.uniform(1, 100), 2), rng.choice(['Food', 'Rent', 'Fun']),
+                                          day, 'expense')
+            latencies['add_transaction'].append(time.perf_counter() - start)
+        else:
+            await session.generate_report(day.replace(day=1), day)
+            latencies['generate_report'].append(time.perf_counter() - start)
+
+async def run_load_test(db_name, sessions=200, operations=20, max_workers=8, seed=0, hasher=None):
+    service = FinanceService(db_name, max_workers=max_workers, hasher=hasher)
+    rng = random.Random(seed)
+    latencies = {'login': [], 'add_transaction': [], 'generate_report': []}
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(_client(service, number, operations, random.Random(rng.random()), latencies)
+                               for number in range(sessions)))
+    finally:
+        elapsed = time.perf_counter() - start
+        await service.close()
+    total = sum(len(samples) for samples in latencies.values())
+    return {'sessions': sessions, 'operations_per_session': operations, 'max_workers': max_workers,
+            'password_hash': {'algorithm': service.hasher.algorithm, 'cost': service.hasher.cost},
+            'seconds': elapsed, 'requests_per_second': total / elapsed,
+            'latency_ms': {name: {'count': len(samples), 'p50': statistics.median(samples) * 1000,
+                                  'p95': sorted(samples)[int(len(samples) * 0.95)] * 1000}
+                           for name, samples in latencies.items() if samples},
+            'report_cache': service.report_cache.stats()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test FinanceService with concurrent stand-in clients.")
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--operations', type=int, default=20, help="requests per session after login")
+    parser.add_argument('--workers', type=int, default=8, help="database worker threads")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--hash-algorithm', choices=PasswordHasher.ALGORITHMS, default='scrypt')
+    parser.add_argument('--hash-cost', type=int, help="scrypt N or PBKDF2 iterations (default: the hasher's)")
+    args = parser.parse_args()
+    try:
+        hasher = PasswordHasher(args.hash_algorithm, args.hash_cost)
+    except ValueError as error:
+        parser.error(str(error))
+    with tempfile.TemporaryDirectory() as directory:
+        results = asyncio.run(run_load_test(os.path.join(directory, 'service.db'), args.sessions,
+                                            args.operations, args.workers, args.seed, hasher))
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import unittest
+import contextlib
+import io
+import os
+from datetime import date, timedelta
+
+from finance_app import FinanceApp
+
+try:
+    import numpy as np
+    from finance_analytics import rolling_average
+except ImportError:  # numpy is optional
+    np = None
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestAnalytics(unittest.TestCase):
+    def setUp(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.app = FinanceApp('test_analytics.db')
+            self.app.register_user('testuser', 'testpass')
+            self.app.login('testuser', 'testpass')
+            start = date(2023, 1, 1)
+            rows = []
+            for day in range(730):
+                rows.append((10, 'Food', start + timedelta(days=day), 'expense'))
+                if day % 7 == 0:
+                    rows.append((50, 'Fuel', start + timedelta(days=day), 'expense'))
+            rows.append((3000, 'Salary', date(2024, 3, 1), 'income'))
+            self.app.add_transactions(rows)
+        self.analytics = self.app.analytics()
+
+    def tearDown(self):
+        self.app.close()
+        os.remove('test_analytics.db')
+
+    def test_monthly_series(self):
+        months, totals = self.analytics.monthly_series(category='Food')
+        self.assertEqual(len(months), 24)
+        self.assertEqual(months[0], date(2023, 1, 1))
+        self.assertEqual(totals[1], 280)
+        months, totals = self.analytics.monthly_series('income')
+        self.assertEqual((months, totals.tolist()), ([date(2024, 3, 1)], [3000]))
+
+    def test_weekly_series_starts_on_monday(self):
+        weeks, totals = self.analytics.weekly_series(category='Food', start_date=date(2023, 1, 2),
+                                                     end_date=date(2023, 1, 15))
+        self.assertEqual(weeks, [date(2023, 1, 2), date(2023, 1, 9)])
+        self.assertEqual(totals.tolist(), [70, 70])
+
+    def test_category_trends_match_monthly_series(self):
+        months, trends = self.analytics.category_trends()
+        self.assertEqual(sorted(trends), ['Food', 'Fuel'])
+        for category, series in trends.items():
+            self.assertTrue(np.allclose(series, self.analytics.monthly_series(category=category)[1]))
+
+    def test_year_over_year(self):
+        comparison = self.analytics.year_over_year(2024, category='Food')
+        self.assertEqual(comparison['current'][1], 290)
+        self.assertEqual(comparison['previous'][1], 280)
+        self.assertAlmostEqual(comparison['change_pct'][1], 290 / 280 * 100 - 100)
+
+    def test_forecast_and_rolling_average(self):
+        months, forecast = self.analytics.forecast(months_ahead=2, category='Food')
+        self.assertEqual(months, [date(2025, 1, 1), date(2025, 2, 1)])
+        self.assertTrue(np.all((forecast > 250) & (forecast < 350)))
+        self.assertEqual(rolling_average([2, 4, 6, 8], 2).tolist(), [2, 3, 5, 7])
+
+    def test_store_reloads_after_add_while_shared(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.app.add_transaction(5, 'Food', date(2025, 1, 1), 'expense')
+        months, _ = self.app.analytics().monthly_series(category='Food')
+        self.assertEqual(months[-1], date(2025, 1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,14 @@
 import unittest
+import contextlib
+import csv
+import hashlib
+import io
+import json
 import os
-from finance_app import FinanceApp, User, Transaction
-from datetime import date
+import sqlite3
+import threading
+from finance_app import ConnectionPool, FinanceApp, PasswordHasher, StorageConfig, ReportCache, User, Transaction, run_cli
+from datetime import date, timedelta
 
 class TestFinanceApp(unittest.TestCase):
     def setUp(self):
@@ -10,7 +17,7 @@ class TestFinanceApp(unittest.TestCase):
         self.app.login('testuser', 'testpass')
 
     def tearDown(self):
-        self.app.conn.close()
+        self.app.close()
         os.remove('test.db')
 
     def test_register_user(self):
@@ -30,6 +37,17 @@ class TestFinanceApp(unittest.TestCase):
         self.assertEqual(len(self.app.current_user.transactions), 1)
         self.assertEqual(self.app.current_user.transactions[0].amount, 100)
 
+    def test_add_transactions_bulk(self):
+        self.app.set_budget('Food', 100)
+        rows = [(10, 'Food', date.today(), 'expense') for _ in range(25)]
+        rows.append(Transaction(500, 'Salary', date.today(), 'income'))
+        rows.append((5, 'Food', 'not-a-date', 'expense'))
+        rows.append((5, 'Food', date.today(), 'transfer'))
+        added = self.app.add_transactions(rows, batch_size=10)
+        self.assertEqual(added, 26)
+        self.assertEqual(len(self.app.current_user.transactions), 26)
+        self.assertEqual(self.app.get_budget_status('Food')['spent'], 250)
+
     def test_update_transaction(self):
         self.app.add_transaction(100, 'Food', date.today(), 'expense')
         self.app.update_transaction(0, 150, 'Groceries', date.today(), 'expense')
@@ -41,17 +59,289 @@ class TestFinanceApp(unittest.TestCase):
         self.app.delete_transaction(0)
         self.assertEqual(len(self.app.current_user.transactions), 0)
 
+    def test_delete_duplicate_transaction_removes_one_row(self):
+        self.app.add_transaction(4, 'Coffee', date.today(), 'expense')
+        self.app.add_transaction(4, 'Coffee', date.today(), 'expense')
+        self.app.delete_transaction(0)
+        self.assertEqual(len(self.app.current_user.transactions), 1)
+        self.app.update_transaction(0, 5, 'Coffee', date.today(), 'expense')
+        self.assertEqual(self.app.current_user.transactions[0].amount, 5)
+
+    def test_password_hashes_are_salted(self):
+        self.app.register_user('otheruser', 'testpass')
+        self.app.cursor.execute("SELECT password FROM users ORDER BY username")
+        hashes = [row[0] for row in self.app.cursor.fetchall()]
+        self.assertTrue(all(password_hash.startswith('scrypt$') for password_hash in hashes))
+        self.assertNotEqual(hashes[0], hashes[1])
+        self.assertTrue(self.app.current_user.check_password('testpass'))
+        self.assertFalse(self.app.current_user.check_password('wrongpass'))
+
+    def test_legacy_password_is_rehashed_on_login(self):
+        legacy = hashlib.sha256(b'oldpass').hexdigest()
+        self.app.cursor.execute("INSERT INTO users VALUES ('olduser', ?)", (legacy,))
+        self.app.conn.commit()
+        self.assertFalse(self.app.login('olduser', 'wrongpass'))
+        self.app.cursor.execute("SELECT password FROM users WHERE username = 'olduser'")
+        self.assertEqual(self.app.cursor.fetchone()[0], legacy)
+        self.assertTrue(self.app.login('olduser', 'oldpass'))
+        self.app.cursor.execute("SELECT password FROM users WHERE username = 'olduser'")
+        self.assertTrue(self.app.cursor.fetchone()[0].startswith('scrypt$'))
+        self.assertTrue(self.app.login('olduser', 'oldpass'))
+
+    def test_password_cost_change_rehashes_on_login(self):
+        app = FinanceApp('test.db', hasher=PasswordHasher('pbkdf2_sha256', cost=1000))
+        try:
+            self.assertTrue(app.login('testuser', 'testpass'))
+            app.cursor.execute("SELECT password FROM users WHERE username = 'testuser'")
+            self.assertTrue(app.cursor.fetchone()[0].startswith('pbkdf2_sha256$1000$'))
+            self.assertFalse(app.hasher.needs_rehash(app.current_user.password))
+        finally:
+            app.close()
+        self.assertTrue(self.app.login('testuser', 'testpass'))
+
+    def test_password_cost_is_validated(self):
+        for algorithm, cost in [('scrypt', 1000), ('scrypt', 1), ('pbkdf2_sha256', 0)]:
+            with self.assertRaises(ValueError):
+                PasswordHasher(algorithm, cost)
+        self.assertEqual(PasswordHasher('scrypt', 2 ** 10).cost, 1024)
+
+    def test_login_for_missing_user_still_derives_a_key(self):
+        hasher = PasswordHasher(cost=2 ** 10)
+        app = FinanceApp('test.db', verbose=False, hasher=hasher)
+        try:
+            self.assertFalse(app.login('nobody', 'secret'))
+            self.assertTrue(PasswordHasher.check('', hasher._dummy_hash))
+        finally:
+            app.close()
+
+    def test_password_verification_cache(self):
+        hasher = PasswordHasher(cost=2 ** 10, cache_size=1)
+        first, second = hasher.hash('secret'), hasher.hash('secret')
+        self.assertTrue(hasher.verify('secret', first))
+        self.assertFalse(hasher.verify('wrong', first))
+        self.assertTrue(hasher.verify('secret', second))
+        self.assertEqual(list(hasher._verified), [second])
+        self.assertFalse(hasher.verify('secret', 'scrypt$bad'))
+
+    def test_transaction_id_migration(self):
+        conn = sqlite3.connect('test_legacy.db')
+        conn.execute("CREATE TABLE transactions (username TEXT, amount REAL, category TEXT, date TEXT, type TEXT)")
+        conn.execute("INSERT INTO transactions VALUES ('testuser', 10, 'Food', '2024-01-01', 'expense')")
+        conn.commit()
+        conn.close()
+        try:
+            app = FinanceApp('test_legacy.db')
+            app.cursor.execute("SELECT id, amount FROM transactions")
+            self.assertEqual(app.cursor.fetchall(), [(1, 10)])
+            app.close()
+        finally:
+            os.remove('test_legacy.db')
+
+    def test_delete_stale_transaction_fails(self):
+        self.app.add_transaction(80, 'Food', date(2024, 1, 1), 'expense')
+        self.assertEqual(self.app.current_user.transactions[0].amount, 80)
+        other = FinanceApp('test.db', verbose=False)
+        try:
+            other.login('testuser', 'testpass')
+            self.assertTrue(other.delete_transaction(0))
+        finally:
+            other.close()
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.assertFalse(self.app.delete_transaction(0))
+        self.assertIn("no longer exists", out.getvalue())
+        self.assertEqual(self.app.get_budget_status('Food', date(2024, 1, 1))['spent'], 80)
+
     def test_set_budget(self):
         self.app.set_budget('Food', 200)
         self.assertEqual(self.app.current_user.get_budget('Food'), 200)
 
+    def test_budget_status_tracks_spending(self):
+        self.app.set_budget('Food', 200)
+        self.app.add_transaction(150, 'Food', date.today(), 'expense')
+        self.app.add_transaction(80, 'Food', date.today(), 'expense')
+        status = self.app.get_budget_status('Food')
+        self.assertEqual(status['spent'], 230)
+        self.assertTrue(status['exceeded'])
+        self.app.update_transaction(1, 20, 'Food', date.today(), 'expense')
+        self.app.delete_transaction(0)
+        self.assertEqual(self.app.get_budget_status('Food')['spent'], 20)
+        self.app.login('testuser', 'testpass')
+        self.assertEqual(self.app.get_budget_status()[0]['remaining'], 180)
+
+    def test_set_budget_replaces_previous_amount(self):
+        self.app.set_budget('Food', 200)
+        self.app.set_budget('Food', 300)
+        self.app.cursor.execute("SELECT amount FROM budgets WHERE username = 'testuser'")
+        self.assertEqual(self.app.cursor.fetchall(), [(300,)])
+
     def test_generate_report(self):
         self.app.add_transaction(100, 'Food', date.today(), 'expense')
         self.app.add_transaction(200, 'Salary', date.today(), 'income')
         report = self.app.generate_report(date.today(), date.today())
-        self.assertIn('Total Income: $200.00', report)
-        self.assertIn('Total Expenses: $100.00', report)
-        self.assertIn('Savings: $100.00', report)
+        self.assertEqual(report.total_income, 200)
+        self.assertEqual(report.total_expenses, 100)
+        self.assertEqual(report.savings, 100)
+        self.assertIn('Total Income: $200.00', report.render())
+        self.assertIn('Total Expenses: $100.00', report.render())
+        self.assertIn('Savings: $100.00', report.render())
+
+    def test_report_serialization(self):
+        self.app.set_budget('Food', 80)
+        self.app.add_transaction(100, 'Food', date(2024, 1, 5), 'expense')
+        self.app.add_transaction(300, 'Rent', date(2024, 1, 6), 'expense')
+        report = self.app.generate_report(date(2024, 1, 1), date(2024, 1, 31))
+        data = json.loads(report.to_json())
+        self.assertEqual([line['category'] for line in data['categories']], ['Rent', 'Food'])
+        self.assertEqual(data['categories'][1]['variance'], -20)
+        self.assertIsNone(data['categories'][0]['variance'])
+        rows = list(csv.DictReader(io.StringIO(report.to_csv())))
+        self.assertEqual([(row['row'], row['category'], float(row['amount'])) for row in rows[:3]],
+                         [('total', 'income', 0), ('total', 'expenses', 400), ('total', 'savings', -400)])
+        self.assertEqual([row['category'] for row in rows[3:]], ['Rent', 'Food'])
+        self.assertEqual({row['start_date'] for row in rows}, {'2024-01-01'})
+        self.assertIn('  Budget: $80.00 (Over by $20.00)', report.render())
+
+    def test_transactions_are_paged_lazily(self):
+        start = date(2024, 1, 1)
+        for i in range(25):
+            self.app.add_transaction(i, 'Food', start + timedelta(days=i), 'expense')
+        self.app.login('testuser', 'testpass')
+        transactions = self.app.current_user.transactions
+        transactions.page_size = 10
+        self.assertEqual(len(transactions), 25)
+        self.assertEqual(transactions[24].amount, 24)
+        self.assertEqual(transactions[-1].date, start + timedelta(days=24))
+        self.assertEqual([t.amount for t in transactions], list(range(25)))
+        self.assertEqual(len(transactions.page(2)), 5)
+
+    def test_storage_pragmas_and_pool(self):
+        self.assertEqual(self.app.conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+        self.assertEqual(self.app.conn.execute("PRAGMA synchronous").fetchone()[0], 1)
+        self.app.add_transaction(100, 'Food', date.today(), 'expense')
+        results = []
+
+        def read_report():
+            results.append(self.app._report_sums(date.today(), date.today()))
+
+        threads = [threading.Thread(target=read_report) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [{('Food', 'expense'): 100}] * 8)
+        self.assertLessEqual(self.app.pool._opened, self.app.config.pool_size)
+
+    def test_transaction_store_is_columnar(self):
+        start = date(2024, 1, 1)
+        self.app.add_transactions([(i + 1, ['Food', 'Rent', 'Salary'][i % 3], start + timedelta(days=i % 60),
+                                    'income' if i % 3 == 2 else 'expense') for i in range(300)])
+        store = self.app.transaction_store()
+        self.assertEqual(len(store), 300)
+        self.assertEqual(store.nbytes, 300 * 25)
+        self.assertEqual(list(store.dates), sorted(store.dates))
+        lo, hi = store.date_range(date(2024, 1, 10), date(2024, 2, 5))
+        self.assertEqual(hi - lo, 27 * 5)
+        self.app.add_transaction(7, 'Food', date(2024, 1, 15), 'expense')
+        self.assertIs(self.app.transaction_store(), store)
+        lo, hi = store.date_range(date(2024, 1, 15), date(2024, 1, 15))
+        self.assertEqual([row.amount for row in store][hi - 1], 7)
+        self.assertEqual(store[hi - 1].date, date(2024, 1, 15))
+        self.assertEqual(store[hi - 1].transaction_type, 'expense')
+        self.app.delete_transaction(0)
+        self.assertEqual(len(self.app.transaction_store()), 300)
+
+    def test_store_treats_unknown_types_as_expenses(self):
+        self.app.cursor.execute("INSERT INTO transactions (username, amount, category, date, type) "
+                                "VALUES ('testuser', 3, 'Food', '2024-01-01', 'Expense')")
+        self.app.conn.commit()
+        self.app.login('testuser', 'testpass')
+        store = self.app.transaction_store()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertFalse(self.app.add_transaction(5, 'Food', date(2024, 1, 2), 'expences'))
+        self.assertTrue(self.app.add_transaction(4, 'Food', date(2024, 1, 2), 'Expense'))
+        self.assertEqual([row.transaction_type for row in store], ['expense', 'expense'])
+        self.assertEqual(self.app.get_budget_status('Food', date(2024, 1, 1))['spent'], 4)
+
+    def test_store_append_with_exported_column_stays_consistent(self):
+        self.app.add_transaction(5, 'Food', date(2024, 1, 1), 'expense')
+        store = self.app.transaction_store()
+        with memoryview(store.amounts):
+            self.app.add_transaction(7, 'Food', date(2024, 1, 2), 'expense')
+            self.assertEqual(len(store), 1)
+            self.assertEqual([row.amount for row in store], [5])
+        self.assertEqual(len(self.app.transaction_store()), 2)
+
+    def test_pool_drops_connections_closed_while_checked_out(self):
+        pool = ConnectionPool('test.db', StorageConfig(pool_size=1))
+        try:
+            with pool.connection() as conn:
+                pool.close()
+            with pool.connection() as conn:
+                self.assertEqual(conn.execute("SELECT 1").fetchone(), (1,))
+        finally:
+            pool.close()
+
+    def test_user_date_index_exists(self):
+        self.app.cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'transactions'")
+        self.assertIn('idx_transactions_user_date', [row[0] for row in self.app.cursor.fetchall()])
+
+    def test_monthly_rollup_tracks_edits(self):
+        self.app.add_transaction(100, 'Food', date(2024, 1, 5), 'expense')
+        self.app.add_transaction(50, 'Food', date(2024, 1, 20), 'expense')
+        self.app.update_transaction(1, 70, 'Food', date(2024, 2, 1), 'expense')
+        self.app.delete_transaction(0)
+        self.app.cursor.execute("SELECT month, category, type, total, count FROM monthly_rollup")
+        self.assertEqual(self.app.cursor.fetchall(), [('2024-02', 'Food', 'expense', 70, 1)])
+
+    def test_report_sums_span_partial_and_whole_months(self):
+        start = date(2023, 11, 20)
+        for i in range(120):
+            self.app.add_transaction(i + 1, 'Rent' if i % 2 else 'Food', start + timedelta(days=i), 'expense')
+        for range_start, range_end in [(date(2023, 11, 25), date(2024, 2, 10)),
+                                       (date(2023, 12, 1), date(2024, 1, 31)),
+                                       (date(2024, 1, 3), date(2024, 1, 9))]:
+            expected = {}
+            for i in range(120):
+                if range_start <= start + timedelta(days=i) <= range_end:
+                    key = ('Rent' if i % 2 else 'Food', 'expense')
+                    expected[key] = expected.get(key, 0) + i + 1
+            self.assertEqual(self.app._report_sums(range_start, range_end), expected)
+
+    def test_report_cache_invalidation(self):
+        cache = self.app.report_cache
+        self.app.add_transaction(100, 'Food', date(2024, 1, 10), 'expense')
+        january = (date(2024, 1, 1), date(2024, 1, 31))
+        march = (date(2024, 3, 1), date(2024, 3, 31))
+        report = self.app.generate_report(*january)
+        self.app.generate_report(*march)
+        self.assertIs(self.app.generate_report(*january), report)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+        self.app.add_transaction(50, 'Food', date(2024, 1, 20), 'expense')
+        self.assertIsNone(cache.get('testuser', 'report', *january))
+        self.assertIsNotNone(cache.get('testuser', 'report', *march))
+        self.assertEqual(self.app.generate_report(*january).total_expenses, 150)
+
+        self.app.set_budget('Rent', 500)
+        self.assertIsNotNone(cache.get('testuser', 'report', *january))
+        self.app.set_budget('Food', 500)
+        self.assertIsNone(cache.get('testuser', 'report', *january))
+        self.assertEqual(self.app.generate_report(*january).categories[0].budget, 500)
+
+        self.app.update_transaction(0, 10, 'Food', date(2024, 3, 5), 'expense')
+        self.assertEqual(self.app.generate_report(*january).total_expenses, 50)
+        self.assertEqual(self.app.generate_report(*march).total_expenses, 10)
+
+    def test_report_cache_evicts_least_recently_used(self):
+        cache = ReportCache(maxsize=2)
+        cache.put('u', 'report', 1, 1, 'a')
+        cache.put('u', 'report', 2, 2, 'b')
+        cache.get('u', 'report', 1, 1)
+        cache.put('u', 'report', 3, 3, 'c')
+        self.assertIsNone(cache.get('u', 'report', 2, 2))
+        self.assertEqual(cache.get('u', 'report', 1, 1), 'a')
+        self.assertEqual(cache.stats()['evictions'], 1)
 
     def test_backup_restore(self):
         self.app.add_transaction(100, 'Food', date.today(), 'expense')
@@ -66,5 +356,180 @@ class TestFinanceApp(unittest.TestCase):
         
         os.remove('test_backup.csv')
 
+    def test_backup_restore_compressed_is_rerunnable(self):
+        self.app.add_transaction(4, 'Coffee', date.today(), 'expense')
+        self.app.add_transaction(4, 'Coffee', date.today(), 'expense')
+        self.app.register_user('other', 'otherpass')
+        self.app.cursor.execute("INSERT INTO transactions (username, amount, category, date, type) "
+                                "VALUES ('other', 1, 'Food', '2024-01-01', 'expense')")
+        self.assertEqual(self.app.backup_data('test_backup.csv.gz'), 2)
+        try:
+            with open('test_backup.csv.gz', 'rb') as f:
+                self.assertEqual(f.read(2), b'\x1f\x8b')
+            self.app.delete_transaction(0)
+            self.assertEqual(self.app.restore_data('test_backup.csv.gz'), 1)
+            self.assertEqual(self.app.restore_data('test_backup.csv.gz'), 0)
+            self.assertEqual(len(self.app.current_user.transactions), 2)
+            self.assertEqual(self.app.get_budget_status('Coffee')['spent'], 8)
+        finally:
+            os.remove('test_backup.csv.gz')
+
+    def test_restore_into_other_database_is_rerunnable(self):
+        self.app.add_transaction(10, 'Food', date(2024, 1, 1), 'expense')
+        self.app.add_transaction(20, 'Rent', date(2024, 1, 2), 'expense')
+        self.app.backup_data('test_backup.csv')
+        other = FinanceApp('test_other.db', verbose=False)
+        try:
+            other.register_user('testuser', 'testpass')
+            other.login('testuser', 'testpass')
+            other.add_transaction(5, 'Fun', date(2024, 1, 3), 'expense')
+            self.assertEqual(other.restore_data('test_backup.csv', chunk_size=1), 2)
+            self.assertEqual(other.restore_data('test_backup.csv', chunk_size=1), 0)
+            self.assertEqual(other.restore_data('test_backup.csv'), 0)
+            self.assertEqual(len(other.current_user.transactions), 3)
+        finally:
+            other.close()
+            os.remove('test_other.db')
+            os.remove('test_backup.csv')
+
+    def test_restore_keeps_repeat_that_owns_a_reassigned_id(self):
+        for day in range(1, 6):
+            self.app.add_transaction(day, 'Rent', date(2024, 2, day), 'expense')
+        with open('test_backup.csv', 'w') as f:
+            f.write("id,username,amount,category,date,type\n")
+            f.write("3,testuser,4,Coffee,2024-01-01,expense\n")
+            f.write("6,testuser,4,Coffee,2024-01-01,expense\n")
+        try:
+            self.assertEqual(self.app.restore_data('test_backup.csv', chunk_size=1), 2)
+            self.assertEqual(self.app.restore_data('test_backup.csv', chunk_size=1), 0)
+            self.assertEqual(self.app.get_budget_status('Coffee', date(2024, 1, 1))['spent'], 8)
+        finally:
+            os.remove('test_backup.csv')
+
+    def test_snapshot_restore(self):
+        self.app.set_budget('Food', 200)
+        self.app.add_transaction(100, 'Food', date.today(), 'expense')
+        steps = []
+        self.app.snapshot_data('test_snapshot.db', pages=1, progress=lambda status, remaining, total: steps.append(total))
+        try:
+            self.assertTrue(steps)
+            self.app.delete_transaction(0)
+            self.app.set_budget('Food', 50)
+            self.assertTrue(self.app.restore_snapshot('test_snapshot.db'))
+            self.assertEqual(len(self.app.current_user.transactions), 1)
+            self.assertEqual(self.app.current_user.get_budget('Food'), 200)
+            self.assertEqual(self.app.get_budget_status('Food')['spent'], 100)
+        finally:
+            os.remove('test_snapshot.db')
+
+    def test_restore_legacy_backup_without_ids(self):
+        with open('test_legacy.csv', 'w') as f:
+            f.write("username,amount,category,date,type\n")
+            f.write("testuser,4,Coffee,2024-01-01,expense\n" * 2)
+            f.write("testuser,oops,Coffee,2024-01-01,expense\n")
+        try:
+            self.assertEqual(self.app.restore_data('test_legacy.csv'), 2)
+            self.assertEqual(self.app.restore_data('test_legacy.csv'), 0)
+            self.assertEqual(self.app.current_user.transactions[0].amount, 4.0)
+        finally:
+            os.remove('test_legacy.csv')
+
+    def test_cli_batch_mode(self):
+        with open('test_batch.txt', 'w') as f:
+            f.write("# nightly import\n")
+            f.write("add 100 Food 2024-01-05 expense\n")
+            f.write("add 300 Salary 2024-01-06 income\n")
+            f.write("budget Food 80 --month 2024-01\n")
+            f.write("report 2024-01-01 2024-01-31\n")
+        out = io.StringIO()
+        try:
+            with contextlib.redirect_stderr(io.StringIO()):
+                exit_code = run_cli(['--db', 'test.db', '--user', 'testuser', '--password', 'testpass',
+                                     '--batch', 'test_batch.txt'], out=out)
+        finally:
+            os.remove('test_batch.txt')
+        self.assertEqual(exit_code, 0)
+        results = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(results[0], {'added': 1})
+        self.assertTrue(results[2]['exceeded'])
+        self.assertEqual(results[3]['savings'], 200)
+
+    def test_cli_batch_switches_user(self):
+        self.app.register_user('bob', 'b')
+        with open('test_batch.txt', 'w') as f:
+            f.write("--user bob --password b add 999 Food 2024-01-05 expense\n")
+            f.write("--user bob --password wrong add 1 Food 2024-01-05 expense\n")
+            f.write("add 5 Food 2024-01-05 expense\n")
+        try:
+            with contextlib.redirect_stderr(io.StringIO()):
+                exit_code = run_cli(['--db', 'test.db', '--user', 'testuser', '--password', 'testpass',
+                                     '--batch', 'test_batch.txt'], out=io.StringIO())
+        finally:
+            os.remove('test_batch.txt')
+        self.assertEqual(exit_code, 1)
+        self.app.cursor.execute("SELECT username, amount FROM transactions ORDER BY id")
+        self.assertEqual(self.app.cursor.fetchall(), [('bob', 999), ('testuser', 5)])
+
+    def test_cli_batch_requires_a_command_per_line(self):
+        with open('test_batch.txt', 'w') as f:
+            f.write("add 5 Food 2024-01-05 expense\n")
+            f.write("--format csv\n")
+        try:
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr), self.assertRaises(SystemExit):
+                run_cli(['--db', 'test.db', '--user', 'testuser', '--password', 'testpass',
+                         '--batch', 'test_batch.txt'], out=io.StringIO())
+        finally:
+            os.remove('test_batch.txt')
+        self.assertIn("line 2: a command is required", stderr.getvalue())
+        self.assertEqual(len(self.app.current_user.transactions), 0)
+
+    def test_cli_rejects_invalid_month(self):
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            run_cli(['--db', 'test.db', '--user', 'testuser', '--password', 'testpass',
+                     'budget', 'Food', '--month', '2024-13'], out=io.StringIO())
+
+    def test_cli_rejects_bad_credentials(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            exit_code = run_cli(['--db', 'test.db', '--user', 'testuser', '--password', 'wrong',
+                                 'backup', 'test_backup.csv'], out=io.StringIO())
+        self.assertEqual(exit_code, 1)
+        self.assertFalse(os.path.exists('test_backup.csv'))
+
+    def test_instrumentation_stats(self):
+        self.assertEqual(self.app.stats()['enabled'], False)
+        self.app.enable_instrumentation(progress_interval=10)
+        self.app.add_transactions([(i, 'Food', date(2024, 1, 1) + timedelta(days=i), 'expense') for i in range(50)])
+        self.app.add_transaction(5, 'Food', date(2024, 3, 1), 'expense')
+        self.app.generate_report(date(2024, 1, 1), date(2024, 3, 31))
+        self.app.generate_report(date(2024, 1, 1), date(2024, 3, 31))
+        stats = self.app.stats()
+        self.assertEqual(stats['operations']['generate_report']['count'], 2)
+        self.assertEqual(stats['operations']['add_transactions']['count'], 1)
+        self.assertEqual(stats['commits'], 2)
+        self.assertGreater(stats['vm_instructions'], 0)
+        self.assertIn('INSERT INTO transactions (username, amount, category, date, type) VALUES (?, ?, ?, ?, ?)',
+                      stats['statements'])
+        self.assertEqual(stats['report_cache']['hits'], 1)
+        self.app.disable_instrumentation()
+        self.app.add_transaction(5, 'Food', date(2024, 3, 1), 'expense')
+        self.assertEqual(self.app.stats()['enabled'], False)
+
+    def test_cli_stats_command(self):
+        out = io.StringIO()
+        with contextlib.redirect_stderr(io.StringIO()):
+            run_cli(['--db', 'test.db', '--user', 'testuser', '--password', 'testpass', '--stats',
+                     'add', '10', 'Food', '2024-01-01', 'expense'], out=out)
+        stats = json.loads(out.getvalue().splitlines()[-1])
+        self.assertEqual(stats['operations']['add_transaction']['count'], 1)
+        self.assertEqual(stats['commits'], 1)
+        out = io.StringIO()
+        with contextlib.redirect_stderr(io.StringIO()):
+            run_cli(['--db', 'test.db', '--user', 'testuser', '--password', 'testpass', '--format', 'csv',
+                     'stats'], out=out)
+        rows = [row for row in csv.DictReader(io.StringIO(out.getvalue())) if row['kind'] == 'report_cache']
+        self.assertEqual({row['name'] for row in rows}, {'hits', 'misses', 'evictions', 'invalidations', 'size'})
+        self.assertEqual({row['max_ms'] for row in rows}, {''})
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
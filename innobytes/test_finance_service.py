@@ -0,0 +1,71 @@
+import unittest
+import asyncio
+import os
+from datetime import date
+
+from finance_app import PasswordHasher
+from finance_service import FinanceService, run_load_test
+
+class TestFinanceService(unittest.TestCase):
+    def tearDown(self):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists('test_service.db' + suffix):
+                os.remove('test_service.db' + suffix)
+
+    def test_sessions_are_independent(self):
+        async def scenario():
+            service = FinanceService('test_service.db', max_workers=4, hasher=PasswordHasher(cost=2 ** 10))
+            try:
+                self.assertTrue(await service.register('alice', 'a'))
+                self.assertTrue(await service.register('bob', 'b'))
+                self.assertIsNone(await service.login('alice', 'wrong'))
+                alice = await service.login('alice', 'a')
+                bob = await service.login('bob', 'b')
+                await asyncio.gather(*(alice.add_transaction(10, 'Food', date(2024, 1, i + 1), 'expense')
+                                       for i in range(20)),
+                                     *(bob.add_transaction(5, 'Rent', date(2024, 1, i + 1), 'expense')
+                                       for i in range(10)))
+                await alice.set_budget('Food', 150)
+                alice_report, bob_report = await asyncio.gather(
+                    alice.generate_report(date(2024, 1, 1), date(2024, 1, 31)),
+                    bob.generate_report(date(2024, 1, 1), date(2024, 1, 31)))
+                self.assertEqual(alice_report.total_expenses, 200)
+                self.assertEqual(bob_report.total_expenses, 50)
+                self.assertTrue((await alice.get_budget_status('Food', date(2024, 1, 1)))['exceeded'])
+                await bob.delete_transaction(0)
+                self.assertEqual(len(await bob.list_transactions()), 9)
+                self.assertEqual((await bob.generate_report(date(2024, 1, 1), date(2024, 1, 31))).total_expenses, 45)
+            finally:
+                await service.close()
+
+        asyncio.run(scenario())
+
+    def test_sessions_of_one_user_share_state(self):
+        async def scenario():
+            service = FinanceService('test_service.db', max_workers=4, hasher=PasswordHasher(cost=2 ** 10))
+            try:
+                await service.register('u', 'p')
+                first, second = await service.login('u', 'p'), await service.login('u', 'p')
+                await first.set_budget('Food', 100)
+                await asyncio.gather(first.add_transaction(80, 'Food', date(2024, 1, 1), 'expense'),
+                                     second.add_transaction(80, 'Food', date(2024, 1, 2), 'expense'))
+                status = await first.get_budget_status('Food', date(2024, 1, 1))
+                self.assertEqual(status['spent'], 160)
+                self.assertTrue(status['exceeded'])
+                self.assertTrue(await first.delete_transaction(0))
+                self.assertTrue(await second.delete_transaction(0))
+                self.assertFalse(await second.delete_transaction(0))
+                self.assertEqual((await first.get_budget_status('Food', date(2024, 1, 1)))['spent'], 0)
+            finally:
+                await service.close()
+
+        asyncio.run(scenario())
+
+    def test_load_test(self):
+        results = asyncio.run(run_load_test('test_service.db', sessions=30, operations=5, max_workers=4,
+                                                 hasher=PasswordHasher(cost=2 ** 10)))
+        self.assertEqual(results['latency_ms']['login']['count'], 30)
+        self.assertEqual(sum(latency['count'] for latency in results['latency_ms'].values()), 30 + 30 * 5)
+
+if __name__ == '__main__':
+    unittest.main()